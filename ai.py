@@ -0,0 +1,69 @@
+import asyncio
+import hashlib
+import os
+import google.generativeai as genai
+from metrics import metrics
+
+
+# ✅ Gemini settings (override through the .env file)
+AI_MODEL = os.getenv("AI_MODEL", "gemini-1.5-pro")
+AI_TIMEOUT = float(os.getenv("AI_TIMEOUT", "60"))  # seconds
+AI_CONCURRENCY = int(os.getenv("AI_CONCURRENCY", "2"))
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", "24")) * 3600  # hours -> seconds
+
+# Bump when the prompt or the roster encoding changes, so old cached answers are ignored
+PROMPT_VERSION = "2"
+
+COMMENTARY_PROMPT = """These two Valorant teams were balanced by our bot and are final: do NOT rebuild or re-list them.
+Balancing factors, most important first: K/D, ACS, DMG/Rnd, Win%, FB (first bloods), KAST. Rank is only a tiebreaker.
+Players marked * have private profiles, their missing stats (-) were estimated from the roster average.
+In max 6 short lines: which team looks favored and why, the key players to watch,
+and at most one swap that would improve balance (or say none is needed).
+
+{roster}"""
+
+# (column header, PlayerStats attribute), only the stats the prompt talks about
+ROSTER_COLUMNS = [
+    ("K/D", "kd_ratio"),
+    ("ACS", "acs"),
+    ("DMG/Rnd", "damage_per_round"),
+    ("Win%", "win_pct"),
+    ("FB", "first_bloods"),
+    ("KAST", "kast"),
+]
+
+
+def encode_teams(split):
+    """Compact pipe-separated table of a TeamSplit (one line per player), far fewer tokens than indented JSON."""
+    lines = ["Team|Player|Rank|" + "|".join(header for header, _ in ROSTER_COLUMNS)]
+    for number, team in enumerate(split.teams, start=1):
+        for p in team:
+            marker = "*" if p.username in split.imputed else ""
+            values = ["-" if getattr(p, attr) is None else f"{getattr(p, attr):g}" for _, attr in ROSTER_COLUMNS]
+            lines.append("|".join([str(number), p.username + marker, p.rank, *values]))
+    return "\n".join(lines)
+
+
+def build_prompt(split):
+    return COMMENTARY_PROMPT.format(roster=encode_teams(split))
+
+
+def prompt_key(prompt, model_name=AI_MODEL):
+    """Content address of a prompt, used as the AI response cache key."""
+    return hashlib.sha256(f"{PROMPT_VERSION}\n{model_name}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+class GeminiClient:
+    """Async Gemini wrapper: never blocks the event loop, caps parallel calls and times out."""
+
+    def __init__(self, model_name=AI_MODEL, timeout=AI_TIMEOUT, concurrency=AI_CONCURRENCY):
+        self.model = genai.GenerativeModel(model_name)
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def generate(self, prompt):
+        """Returns the response text. Raises asyncio.TimeoutError if Gemini takes longer than the timeout."""
+        async with self._semaphore:
+            with metrics.span("gemini"):
+                response = await asyncio.wait_for(self.model.generate_content_async(prompt), self.timeout)
+        return response.text.strip() if response.text else ""
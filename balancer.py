@@ -0,0 +1,329 @@
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from itertools import accumulate
+from models import Roster, rank_label
+
+
+# ✅ Balancing weights (PlayerStats attributes), most important first (same order as the old Gemini prompt)
+BALANCE_WEIGHTS = {
+    "kd_ratio": 0.26,
+    "acs": 0.22,
+    "damage_per_round": 0.18,
+    "win_pct": 0.12,
+    "first_bloods": 0.09,
+    "kast": 0.08,
+    "rank_ordinal": 0.05,  # Tiebreaker only
+}
+
+# ✅ Search settings (override through the .env file)
+EXACT_MAX_PLAYERS = int(os.getenv("EXACT_MAX_PLAYERS", "16"))  # Above this, use the heuristic
+SEARCH_RESTARTS = int(os.getenv("SEARCH_RESTARTS", "200"))
+SEARCH_MAX_SWAPS = int(os.getenv("SEARCH_MAX_SWAPS", "300000"))  # Swaps tried per lobby (~0.5s), bounds the heuristic
+SEARCH_TIME_BUDGET = float(os.getenv("SEARCH_TIME_BUDGET", "5"))  # Seconds per lobby, safety cap only
+FORM_WEIGHT = float(os.getenv("FORM_WEIGHT", "0.3"))  # Share of recent form in a player's rating, 0 = season only
+
+def numeric_roster(roster):
+    """Returns every balancing stat as a list of numbers.
+
+    Missing stats (private profiles, 'N/A') are filled with the roster average for that stat.
+    Returns ({stat: [value per player]}, [True if the player had imputed stats]).
+    """
+    columns = {}
+    imputed = [False] * len(roster)
+
+    for stat in BALANCE_WEIGHTS:
+        values = roster.column(stat).tolist()
+
+        known = [v for v in values if v == v]  # Skips NaN (missing)
+        average = sum(known) / len(known) if known else 0.0
+        for i, value in enumerate(values):
+            if value != value:
+                values[i] = average
+                imputed[i] = True
+        columns[stat] = values
+
+    return columns, imputed
+
+
+def form_columns(columns, players, form, weight=FORM_WEIGHT):
+    """Blends recent form into the season stats used to rate players.
+
+    form is {username: {stat: value over recent games}} (see history.recent_form).
+    Returns new columns, or the same ones when there is no form to apply.
+    """
+    if not form or weight <= 0:
+        return columns
+    blended = {stat: list(values) for stat, values in columns.items()}
+    for i, player in enumerate(players):
+        for stat, value in form.get(player.username, {}).items():
+            if stat in blended:
+                blended[stat][i] = (1 - weight) * blended[stat][i] + weight * value
+    return blended
+
+
+def rating_columns(columns, players, form=None, percentiles=None):
+    """Stats the teams are balanced on: season stats with recent form blended in, then
+    turned into percentiles over every stored player when a PercentileIndex is given.
+
+    Percentiles put every stat on the same 0-1 scale and keep one outlier (a 3.0 K/D smurf)
+    from outweighing the rest of the roster.
+    """
+    ratings = form_columns(columns, players, form)
+    if percentiles is not None and percentiles.loaded:
+        ratings = percentiles.normalize_columns(ratings)
+    return ratings
+
+
+@dataclass
+class TeamSplit:
+    teams: list                                   # [team_1_players, team_2_players]
+    averages: list                                # [{stat: average}] per team (season stats)
+    imputed: set = field(default_factory=set)     # Usernames whose stats were estimated
+    cost: float = 0.0                             # Weighted imbalance, 0 = perfectly balanced
+
+
+def _best_split(rows, team_size):
+    """Branch-and-bound over every unique split of 2 * team_size players.
+
+    rows[i][s] is player i's stat s, already weighted and scaled so that the
+    imbalance of a split is sum(|2 * team_1_sum[s] - total[s]|).
+    Player 0 always goes to team 1, which skips the mirrored duplicates (126 splits for 5v5).
+    """
+    n = len(rows)
+    m = len(rows[0]) if rows else 0
+    totals = [sum(row[s] for row in rows) for s in range(m)]
+
+    # Prefix sums of each stat's sorted values over rows[i:], used to bound what the remaining picks can add
+    suffix = []
+    for i in range(n + 1):
+        suffix.append([list(accumulate(sorted(row[s] for row in rows[i:]), initial=0.0)) for s in range(m)])
+
+    best_cost = float("inf")
+    best = None
+    chosen = [0]
+
+    def search(i, sums):
+        nonlocal best_cost, best
+        remaining = team_size - len(chosen)
+
+        if remaining == 0:
+            cost = sum(abs(2 * sums[s] - totals[s]) for s in range(m))
+            if cost < best_cost - 1e-12:
+                best_cost, best = cost, tuple(chosen)
+            return
+        if n - i < remaining:
+            return
+
+        bound = 0.0
+        for s in range(m):
+            ps = suffix[i][s]
+            low = 2 * (sums[s] + ps[remaining])
+            high = 2 * (sums[s] + ps[-1] - ps[len(ps) - 1 - remaining])
+            if totals[s] < low:
+                bound += low - totals[s]
+            elif totals[s] > high:
+                bound += totals[s] - high
+        if bound >= best_cost:
+            return
+
+        chosen.append(i)
+        search(i + 1, [sums[s] + rows[i][s] for s in range(m)])
+        chosen.pop()
+        search(i + 1, sums)
+
+    if n:
+        search(1, list(rows[0]))
+    return best, best_cost
+
+
+def _team_averages(columns, members):
+    return {stat: sum(values[i] for i in members) / len(members) for stat, values in columns.items()}
+
+
+def _local_search(rows, team_size, time_budget=SEARCH_TIME_BUDGET, restarts=SEARCH_RESTARTS,
+                  max_swaps=SEARCH_MAX_SWAPS):
+    """Heuristic split for rosters too big to enumerate.
+
+    Starts from a snake draft on overall strength, then does steepest-descent
+    swaps between the two teams, with seeded random perturbations to escape
+    local optima. Stops after `restarts` rounds or `max_swaps` swap evaluations,
+    so the result doesn't depend on machine load. The time budget is only a
+    safety cap for huge lobbies on slow machines (teams may then vary).
+    """
+    n = len(rows)
+    m = len(rows[0]) if rows else 0
+    totals = [sum(row[s] for row in rows) for s in range(m)]
+
+    def cost_of(sums):
+        return sum(abs(2 * sums[s] - totals[s]) for s in range(m))
+
+    # Snake draft: strongest to team 1, next two to team 2, next two to team 1...
+    order = sorted(range(n), key=lambda i: (-sum(rows[i]), i))
+    team = set(i for rank, i in enumerate(order) if (rank + 1) % 4 < 2)
+    sums = [sum(rows[i][s] for i in team) for s in range(m)]
+
+    rng = random.Random(0)  # Seeded so the same roster gives the same teams
+    deadline = time.perf_counter() + time_budget
+    best_cost, best = cost_of(sums), frozenset(team)
+    swaps = 0
+
+    for _ in range(restarts):
+        # Steepest descent over single swaps
+        while True:
+            current = cost_of(sums)
+            best_swap = None
+            others = [j for j in range(n) if j not in team]
+            swaps += len(team) * len(others)
+            for i in sorted(team):
+                for j in others:
+                    candidate = sum(abs(2 * (sums[s] - rows[i][s] + rows[j][s]) - totals[s]) for s in range(m))
+                    if candidate < current - 1e-12:
+                        current, best_swap = candidate, (i, j)
+            if best_swap is None:
+                break
+            i, j = best_swap
+            team.remove(i)
+            team.add(j)
+            sums = [sums[s] - rows[i][s] + rows[j][s] for s in range(m)]
+
+        current = cost_of(sums)
+        if current < best_cost - 1e-12:
+            best_cost, best = current, frozenset(team)
+        if best_cost == 0 or swaps >= max_swaps or time.perf_counter() > deadline:
+            break
+
+        # Perturb from the best split found so far with a couple of random swaps
+        team = set(best)
+        for _ in range(2):
+            i = rng.choice(sorted(team))
+            j = rng.choice([j for j in range(n) if j not in team])
+            team.remove(i)
+            team.add(j)
+        sums = [sum(rows[i][s] for i in team) for s in range(m)]
+
+    team_1 = tuple(sorted(best))
+    # Keep the same orientation as the exact search (first player in team 1)
+    if 0 not in best:
+        team_1 = tuple(i for i in range(n) if i not in best)
+    return team_1, best_cost
+
+
+def _scaled_rows(columns, indices, team_size):
+    """Weights each stat and scales it by its mean over these players, so the split cost is the weighted relative gap between team averages."""
+    scales = {}
+    for stat, weight in BALANCE_WEIGHTS.items():
+        mean = sum(columns[stat][i] for i in indices) / len(indices)
+        scales[stat] = weight / (team_size * mean) if mean else weight / team_size
+    return [[columns[stat][i] * scales[stat] for stat in BALANCE_WEIGHTS] for i in indices]
+
+
+def _split(players, columns, imputed, indices, team_size, exact=None, ratings=None):
+    # Teams are balanced on the ratings (season stats + recent form), averages show the season stats
+    rows = _scaled_rows(ratings or columns, indices, team_size)
+    if exact is None:
+        exact = len(indices) <= EXACT_MAX_PLAYERS
+
+    local_1, cost = _best_split(rows, team_size) if exact else _local_search(rows, team_size)
+    team_1 = [indices[i] for i in local_1]
+    team_2 = [i for i in indices if i not in team_1]
+
+    return TeamSplit(
+        teams=[[players[i] for i in team_1], [players[i] for i in team_2]],
+        averages=[_team_averages(columns, team_1), _team_averages(columns, team_2)],
+        imputed={players[i].username for i in indices if imputed[i]},
+        cost=cost,
+    )
+
+
+def balance_teams(players, team_size=5, exact=None, form=None, percentiles=None):
+    """Splits exactly 2 * team_size players into the two most balanced teams.
+
+    Small rosters (up to EXACT_MAX_PLAYERS) are searched exhaustively, bigger ones
+    use the local search heuristic. Pass exact=True/False to force either mode.
+    form ({username: {stat: recent value}}) weights recent games in, see form_columns.
+    With a PercentileIndex, players are rated on their percentile among all stored players
+    instead of their raw stats (see rating_columns).
+    Deterministic: the same roster (in the same order) always gives the same teams, as long as
+    the heuristic stays under its SEARCH_TIME_BUDGET safety cap (see _local_search).
+    """
+    if team_size < 1 or len(players) != team_size * 2:
+        raise ValueError(f"Need exactly {team_size * 2} players, got {len(players)}")
+
+    columns, imputed = numeric_roster(Roster(players))
+    ratings = rating_columns(columns, players, form, percentiles)
+    return _split(players, columns, imputed, list(range(len(players))), team_size, exact, ratings)
+
+
+@dataclass
+class LobbyPlan:
+    lobbies: list                                 # One TeamSplit per parallel match
+    bench: list = field(default_factory=list)     # Players who sit out this round
+
+
+def balance_lobbies(players, team_size=5, exact=None, form=None, percentiles=None):
+    """Fills as many parallel team_size vs team_size lobbies as the roster allows.
+
+    Players who don't fit in a full lobby go to the bench, latest sign-ups first.
+    Lobbies are tiered by overall strength (the strongest players play together),
+    then each lobby is split into two balanced teams. form and percentiles work as in balance_teams.
+    """
+    lobby_size = team_size * 2
+    if team_size < 1 or len(players) < lobby_size:
+        raise ValueError(f"Need at least {lobby_size} players, got {len(players)}")
+
+    lobby_count = len(players) // lobby_size
+    playing = lobby_size * lobby_count
+
+    # Missing stats are imputed from the whole roster, not just one lobby
+    columns, imputed = numeric_roster(Roster(players))
+    ratings = rating_columns(columns, players, form, percentiles)
+
+    # Overall strength = weighted sum of each stat relative to the roster mean
+    strength = [0.0] * playing
+    for stat, weight in BALANCE_WEIGHTS.items():
+        values = ratings[stat]
+        mean = sum(values[:playing]) / playing
+        for i in range(playing):
+            strength[i] += weight * (values[i] / mean if mean else 0.0)
+    tiers = sorted(range(playing), key=lambda i: (-strength[i], i))
+
+    lobbies = []
+    for number in range(lobby_count):
+        indices = sorted(tiers[number * lobby_size:(number + 1) * lobby_size])
+        lobbies.append(_split(players, columns, imputed, indices, team_size, exact, ratings))
+
+    return LobbyPlan(lobbies=lobbies, bench=players[playing:])
+
+
+def format_teams(split, title=""):
+    """Renders a TeamSplit in the same layout the Gemini prompt used to ask for."""
+    lines = [title, ""] if title else []
+    for number, team in enumerate(split.teams, start=1):
+        lines.append(f"🏆 Team {number}")
+        for p in team:
+            marker = "*" if p.username in split.imputed else ""
+            lines.append(
+                f"- {p.username}{marker} ({p.rank}), K/D: {p.display('K/D Ratio')}, "
+                f"Win%: {p.display('Win %')}, ACS: {p.display('ACS')}, "
+                f"DMG/Rnd: {p.display('Damage/Round')}, First Bloods: {p.display('First Bloods')}"
+            )
+        lines.append("")
+
+    lines.append("📊 Team Averages:")
+    for number, avg in enumerate(split.averages, start=1):
+        lines.append(
+            f"- Team {number}: Rank: {rank_label(avg['rank_ordinal'])} ({avg['rank_ordinal']:.1f}), "
+            f"K/D: {avg['kd_ratio']:.2f}, Win%: {avg['win_pct']:.1f}%, ACS: {avg['acs']:.1f}, "
+            f"DMG/Rnd: {avg['damage_per_round']:.1f}, First Bloods: {avg['first_bloods']:.1f}, KAST: {avg['kast']:.1f}%"
+        )
+
+    if split.imputed:
+        lines.append("")
+        lines.append("* Private or missing stats, estimated from the roster average.")
+    return "\n".join(lines)
+
+
+def format_bench(bench):
+    return "🪑 Bench: " + ", ".join(p.username for p in bench)
@@ -0,0 +1,528 @@
+"""Offline benchmarks for scraping, storage and team generation.
+
+Runs without network, Discord or Gemini: profiles are served from fixtures/ by a
+local HTTP server, the database lives in a temporary folder and Gemini is stubbed.
+
+    python bench.py                       # full run, results in bench_results.json
+    python bench.py --quick -o before.json
+    python bench.py --only storage --rosters 10,1000 --guilds 1,100
+    python bench.py --only rank --rosters 1000,10000
+    python bench.py --browser             # also check and time the Playwright extraction (needs Chromium)
+    python bench.py --only check          # only assert what the fixtures parse to (exits 1 on a mismatch)
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from ai import build_prompt, prompt_key
+from balancer import balance_lobbies
+from extractor import extract_html, payload_to_stats
+from fetcher import ProfileFetcher, is_challenge, parse_api_profile, parse_profile_html
+from models import RANK_TIERS, PlayerStats
+from percentiles import PercentileIndex, rank_players
+from resilience import ScrapeError
+from storage import PlayerStore
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIXTURE_PLAYER = "Nikkodinho#HAN"  # The profile saved in fixtures/
+
+DEFAULT_ROSTERS = [10, 100, 1000, 10000]
+DEFAULT_GUILDS = [1, 10, 100, 1000]
+GUILD_ROSTER_SIZE = 50  # Players per guild in the guild-count sweep
+LOBBY_SIZES = [10, 16, 20, 40, 100]
+
+STUB_ANALYSIS = "Team 1 looks slightly favored thanks to its entry fraggers. No swap needed."
+
+
+# ---------- Timing helpers ----------
+
+def summarize(samples):
+    """Min/median/p95/mean in milliseconds for a list of durations in seconds."""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+    return {
+        "runs": len(ordered),
+        "min_ms": round(ordered[0] * 1000, 4),
+        "median_ms": round(statistics.median(ordered) * 1000, 4),
+        "p95_ms": round(p95 * 1000, 4),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+    }
+
+
+def time_sync(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def time_async(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+class Results:
+    def __init__(self):
+        self.rows = []
+
+    def add(self, group, name, samples, **params):
+        row = {"group": group, "name": name, "params": params, **summarize(samples)}
+        self.rows.append(row)
+        label = " ".join(f"{k}={v}" for k, v in params.items())
+        print(f"  {group:<8} {name:<28} {label:<26} median {row['median_ms']:>10.3f} ms"
+              f"  p95 {row['p95_ms']:>10.3f} ms", file=sys.__stdout__)
+
+
+@contextlib.contextmanager
+def quiet(enabled=True):
+    """Hides the bot's own progress prints while timing."""
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+# ---------- Synthetic data ----------
+
+def fake_player(rng, number):
+    if rng.random() < 0.1:
+        return PlayerStats.private_profile(f"Player{number}#B{number % 997:03d}")
+    tier = rng.randrange(len(RANK_TIERS))
+    kills = float(rng.randint(100, 5000))
+    return PlayerStats(
+        username=f"Player{number}#B{number % 997:03d}",
+        rank=f"{RANK_TIERS[tier]} {rng.randint(1, 3)}",
+        damage_per_round=round(rng.uniform(90, 200), 1),
+        kd_ratio=round(rng.uniform(0.5, 1.8), 2),
+        headshot_pct=round(rng.uniform(10, 40), 1),
+        win_pct=round(rng.uniform(30, 70), 1),
+        wins=float(rng.randint(5, 400)),
+        kast=round(rng.uniform(55, 80), 1),
+        dd_delta_per_round=round(rng.uniform(-40, 40), 1),
+        kills=kills,
+        deaths=float(rng.randint(100, 5000)),
+        assists=float(rng.randint(50, 2000)),
+        acs=round(rng.uniform(120, 300), 1),
+        kad_ratio=round(rng.uniform(0.8, 2.5), 2),
+        kills_per_round=round(rng.uniform(0.4, 1.1), 2),
+        first_bloods=float(rng.randint(0, 600)),
+        flawless_rounds=float(rng.randint(0, 300)),
+        aces=float(rng.randint(0, 20)),
+    )
+
+
+def fake_roster(rng, size, start=0):
+    return [fake_player(rng, start + i) for i in range(size)]
+
+
+class StubGemini:
+    """Stands in for GeminiClient: same interface, canned answer, optional fake latency."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.timeout = 60
+        self.calls = 0
+
+    async def generate(self, prompt):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return STUB_ANALYSIS
+
+
+# ---------- Local fixture server ----------
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=FIXTURES_DIR, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # The default backlog of 5 stalls the parallel fetch benchmark
+
+
+@contextlib.contextmanager
+def fixture_server():
+    """Serves fixtures/ on a free localhost port. Yields the base URL."""
+    server = FixtureServer(("127.0.0.1", 0), FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+async def fetch_or_none(fetcher, player):
+    """Failed lookups (the all_blocked scenario) raise ScrapeError, timed like successes."""
+    try:
+        return await fetcher.fetch(player)
+    except ScrapeError:
+        return None
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+# ---------- Fixture checks ----------
+
+# What fixtures/profile.html and profile_api.json show for FIXTURE_PLAYER
+EXPECTED_PROFILE = PlayerStats(
+    username=FIXTURE_PLAYER,
+    rank="Ascendant 3",
+    damage_per_round=150.5,
+    kd_ratio=1.08,
+    headshot_pct=24.3,
+    win_pct=52.7,
+    wins=128.0,
+    kast=72.4,
+    dd_delta_per_round=12.0,
+    kills=4812.0,
+    deaths=4456.0,
+    assists=1630.0,
+    acs=248.2,
+    kad_ratio=1.45,
+    kills_per_round=0.9,
+    first_bloods=612.0,
+    flawless_rounds=301.0,
+    aces=9.0,
+)
+EXPECTED_PRIVATE = PlayerStats.private_profile(FIXTURE_PLAYER)
+
+
+def expect(what, actual, expected):
+    if actual != expected:
+        raise AssertionError(f"{what}:\n  got      {actual!r}\n  expected {expected!r}")
+    print(f"  check    {what:<56} ok", file=sys.__stdout__)
+
+
+def check_fixtures():
+    """Asserts what the offline parsers make of the saved fixture pages, so a parser change can't silently break scraping."""
+    print("🔹 Fixture checks", file=sys.__stdout__)
+    expect("parse_profile_html(profile.html)",
+           parse_profile_html(FIXTURE_PLAYER, read_fixture("profile.html")), EXPECTED_PROFILE)
+    expect("parse_profile_html(profile_private.html)",
+           parse_profile_html(FIXTURE_PLAYER, read_fixture("profile_private.html")), EXPECTED_PRIVATE)
+    expect("parse_api_profile(profile_api.json)",
+           parse_api_profile(FIXTURE_PLAYER, json.loads(read_fixture("profile_api.json"))), EXPECTED_PROFILE)
+    expect("parse_api_profile(profile_private_api.json)",
+           parse_api_profile(FIXTURE_PLAYER, json.loads(read_fixture("profile_private_api.json"))), EXPECTED_PRIVATE)
+    expect("is_challenge(cloudflare.html)", is_challenge(200, read_fixture("cloudflare.html")), True)
+    for name in ("profile.html", "profile_private.html"):
+        expect(f"is_challenge({name})", is_challenge(200, read_fixture(name)), False)
+
+
+async def check_browser_extraction(verbose):
+    """Runs EXTRACT_JS (what production runs in Chrome) on the fixture pages and asserts it
+    returns the same payload as extract_html, the static parser the checks above go through."""
+    from browser_pool import BrowserPool
+    from extractor import extract_page
+
+    pool = BrowserPool(headless=True)
+    with quiet(not verbose):
+        await pool.start()
+    try:
+        for name in ("profile.html", "profile_private.html", "cloudflare.html"):
+            html = read_fixture(name)
+            async with pool.page() as page:
+                await page.set_content(html)
+                payload = await extract_page(page)
+            expect(f"EXTRACT_JS == extract_html ({name})", payload, extract_html(html))
+    finally:
+        with quiet(not verbose):
+            await pool.stop()
+
+
+# ---------- Benchmarks ----------
+
+async def bench_extraction(results, runs, concurrency, browser, verbose):
+    print("🔹 Extraction", file=sys.__stdout__)
+    pages = {name: read_fixture(f"{name}.html") for name in ("profile", "profile_private", "cloudflare")}
+    api_payloads = {name: json.loads(read_fixture(f"{name}.json")) for name in ("profile_api", "profile_private_api")}
+
+    for name, html in pages.items():
+        results.add("extract", "extract_html", time_sync(lambda: extract_html(html), runs), fixture=name)
+    results.add("extract", "parse_profile_html",
+                time_sync(lambda: parse_profile_html(FIXTURE_PLAYER, pages["profile"]), runs), fixture="profile")
+    for name, payload in api_payloads.items():
+        results.add("extract", "parse_api_profile",
+                    time_sync(lambda: parse_api_profile(FIXTURE_PLAYER, payload), runs), fixture=name)
+
+    with fixture_server() as base:
+        # (scenario, API URL, page URL): the query string carries the Riot ID like the real URLs do
+        scenarios = [
+            ("api", f"{base}/profile_api.json?id={{}}", f"{base}/profile.html?id={{}}"),
+            ("page_fallback", f"{base}/cloudflare.html?id={{}}", f"{base}/profile.html?id={{}}"),
+            ("all_blocked", f"{base}/cloudflare.html?id={{}}", f"{base}/cloudflare.html?id={{}}"),
+        ]
+        for scenario, api_url, page_url in scenarios:
+            fetcher = ProfileFetcher(api_url=api_url, page_url=page_url)
+            try:
+                with quiet(not verbose):
+                    await fetch_or_none(fetcher, FIXTURE_PLAYER)  # Warm up the connection pool
+                    single = await time_async(lambda: fetch_or_none(fetcher, FIXTURE_PLAYER), runs)
+                    batch = await time_async(
+                        lambda: asyncio.gather(*(fetch_or_none(fetcher, FIXTURE_PLAYER) for _ in range(concurrency))),
+                        max(1, runs // 10),
+                    )
+            finally:
+                await fetcher.close()
+            results.add("extract", "http_fetch", single, scenario=scenario)
+            results.add("extract", "http_fetch_batch", batch, scenario=scenario, players=concurrency)
+
+        if browser:
+            await bench_browser(results, base, runs, verbose)
+
+
+async def bench_browser(results, base, runs, verbose):
+    from browser_pool import BrowserPool
+    from extractor import READY_SELECTOR, extract_page
+
+    pool = BrowserPool(headless=True)
+    with quiet(not verbose):
+        await pool.start()
+    try:
+        for fixture in ("profile", "profile_private"):
+            async def scrape():
+                async with pool.page() as page:
+                    await page.goto(f"{base}/{fixture}.html")
+                    await page.wait_for_selector(READY_SELECTOR, timeout=20000)
+                    return payload_to_stats(FIXTURE_PLAYER, await extract_page(page))
+
+            expect(f"browser scrape ({fixture}.html)", await scrape(),
+                   EXPECTED_PROFILE if fixture == "profile" else EXPECTED_PRIVATE)
+            results.add("extract", "browser_scrape", await time_async(scrape, max(1, runs // 10)), fixture=fixture)
+    finally:
+        with quiet(not verbose):
+            await pool.stop()
+
+
+async def bench_storage(results, rosters, guilds, runs, seed, verbose):
+    print("🔹 Storage", file=sys.__stdout__)
+    rng = random.Random(seed)
+
+    with tempfile.TemporaryDirectory() as folder, quiet(not verbose):
+        # Roster-size sweep: one guild holding n players
+        for size in rosters:
+            store = PlayerStore(os.path.join(folder, f"roster_{size}.db"))
+            roster = fake_roster(rng, size)
+            guild_id = 1
+
+            async def save_all():
+                await store.upsert_players(guild_id, roster)
+
+            results.add("storage", "save_to_files", await time_async(save_all, max(1, runs // 10)),
+                        roster=size, guilds=1, players_saved=size)
+            await bench_guild_ops(results, store, rng, guild_id, size, 1, runs)
+            store.close()
+
+        # Guild-count sweep: g guilds of GUILD_ROSTER_SIZE players, timing one guild's operations
+        for count in guilds:
+            store = PlayerStore(os.path.join(folder, f"guilds_{count}.db"))
+            for guild_id in range(1, count + 1):
+                await store.upsert_players(guild_id, fake_roster(rng, GUILD_ROSTER_SIZE))
+            await bench_guild_ops(results, store, rng, rng.randint(1, count), GUILD_ROSTER_SIZE, count, runs)
+            store.close()
+
+
+async def bench_guild_ops(results, store, rng, guild_id, size, guild_count, runs):
+    """Times the per-command storage calls against a guild that already holds `size` players."""
+    params = {"roster": size, "guilds": guild_count}
+
+    results.add("storage", "load_existing_data",
+                await time_async(lambda: store.load_players(guild_id), runs), **params)
+
+    # v/st adding a handful of new players to an existing list
+    new_players = iter(fake_roster(rng, runs * 5, start=10_000_000))
+
+    async def add_five():
+        await store.upsert_players(guild_id, [next(new_players) for _ in range(5)])
+
+    results.add("storage", "save_to_files", await time_async(add_five, runs), players_saved=5, **params)
+
+    # v/r on players that exist, each removed once
+    victims = iter([p.username for p in await store.load_players(guild_id)][:runs])
+
+    async def remove_one():
+        await store.remove_player(guild_id, next(victims))
+
+    results.add("storage", "remove_player", await time_async(remove_one, min(runs, size)), **params)
+
+
+async def bench_teams(results, sizes, runs, seed, verbose):
+    print("🔹 Team generation", file=sys.__stdout__)
+    rng = random.Random(seed)
+
+    for size in sizes:
+        roster = fake_roster(rng, size)
+        timed_runs = runs if size <= 20 else max(1, runs // 10)
+        results.add("teams", "balance_lobbies",
+                    time_sync(lambda: balance_lobbies(roster, 5), timed_runs), players=size, team_size=5)
+
+    # Whole v/gt ai path with Gemini stubbed: load, balance, prompt, AI cache lookup/store
+    with tempfile.TemporaryDirectory() as folder, quiet(not verbose):
+        store = PlayerStore(os.path.join(folder, "teams.db"))
+        gemini = StubGemini()
+        guild_id = 1
+        await store.upsert_players(guild_id, fake_roster(rng, 10))
+
+        async def generate_teams(use_cache=True):
+            players = await store.load_players(guild_id)
+            plan = await asyncio.to_thread(balance_lobbies, players, 5)
+            for split in plan.lobbies:
+                prompt = build_prompt(split)
+                key = prompt_key(prompt)
+                if use_cache and await store.get_ai_response(guild_id, key, 3600) is not None:
+                    continue
+                analysis = await gemini.generate(prompt)
+                await store.put_ai_response(guild_id, key, analysis, 3600)
+
+        results.add("teams", "generate_teams_ai", await time_async(lambda: generate_teams(False), runs),
+                    players=10, ai_cache="miss")
+        results.add("teams", "generate_teams_ai", await time_async(generate_teams, runs),
+                    players=10, ai_cache="hit")
+        store.close()
+
+
+async def bench_percentiles(results, rosters, runs, seed, verbose):
+    print("🔹 Percentile index", file=sys.__stdout__)
+    rng = random.Random(seed)
+
+    with tempfile.TemporaryDirectory() as folder, quiet(not verbose):
+        for size in rosters:
+            store = PlayerStore(os.path.join(folder, f"percentiles_{size}.db"))
+            # All stored players spread over guilds of GUILD_ROSTER_SIZE, like a real database
+            for start in range(0, size, GUILD_ROSTER_SIZE):
+                await store.upsert_players(start // GUILD_ROSTER_SIZE + 1,
+                                           fake_roster(rng, min(GUILD_ROSTER_SIZE, size - start), start))
+            params = {"stored_players": size}
+
+            async def build():
+                index = PercentileIndex(store)
+                await index.load()
+                return index
+
+            results.add("rank", "percentile_load", await time_async(build, max(1, runs // 10)), **params)
+            index = await build()
+
+            # save_to_files of a v/st batch: 5 players into the sorted columns
+            new_players = iter(fake_roster(rng, runs * 5, start=10_000_000))
+            results.add("rank", "percentile_upsert",
+                        time_sync(lambda: index.upsert([next(new_players) for _ in range(5)]), runs),
+                        players_saved=5, **params)
+
+            roster = await store.load_players(1)
+            results.add("rank", "top_10_acs",
+                        time_sync(lambda: [index.percentile("acs", v) for _, v in rank_players(roster, "acs", 10)],
+                                  runs), roster=len(roster), **params)
+            results.add("rank", "balance_lobbies_pct",
+                        time_sync(lambda: balance_lobbies(roster, 5, percentiles=index), max(1, runs // 10)),
+                        players=len(roster), **params)
+            store.close()
+
+
+# ---------- Entry point ----------
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def int_list(text):
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+async def run(args):
+    results = Results()
+    groups = set(args.only.split(",")) if args.only else {"check", "extract", "storage", "teams", "rank"}
+
+    # Checks first: timings of parsers that return the wrong stats are meaningless
+    if "check" in groups:
+        check_fixtures()
+        if args.browser:
+            await check_browser_extraction(args.verbose)
+    if "extract" in groups:
+        await bench_extraction(results, args.runs, args.concurrency, args.browser, args.verbose)
+    if "storage" in groups:
+        await bench_storage(results, args.rosters, args.guilds, args.runs, args.seed, args.verbose)
+    if "teams" in groups:
+        await bench_teams(results, args.lobby_sizes, args.runs, args.seed, args.verbose)
+    if "rank" in groups:
+        await bench_percentiles(results, args.rosters, args.runs, args.seed, args.verbose)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the bot (no network, Discord or Gemini).")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="JSON file to write the results to")
+    parser.add_argument("--only", default="", help="Comma-separated groups to run: check,extract,storage,teams,rank")
+    parser.add_argument("--runs", type=int, default=50, help="Timed runs per benchmark")
+    parser.add_argument("--rosters", type=int_list, default=DEFAULT_ROSTERS, help="Roster sizes, e.g. 10,100,1000")
+    parser.add_argument("--guilds", type=int_list, default=DEFAULT_GUILDS, help="Guild counts, e.g. 1,10,100")
+    parser.add_argument("--lobby-sizes", type=int_list, default=LOBBY_SIZES, help="Roster sizes for v/gt")
+    parser.add_argument("--concurrency", type=int, default=20, help="Parallel fetches in the batch benchmark")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--browser", action="store_true", help="Also check and time the Playwright extraction")
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes and fewer runs, for a smoke check")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Keep the bot's own log output")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.runs = min(args.runs, 10)
+        args.rosters = [n for n in args.rosters if n <= 1000]
+        args.guilds = [n for n in args.guilds if n <= 100]
+        args.lobby_sizes = [n for n in args.lobby_sizes if n <= 20]
+
+    started = time.time()
+    results = asyncio.run(run(args))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started)),
+            "duration_s": round(time.time() - started, 2),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "runs": args.runs,
+        },
+        "results": results.rows,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ {len(results.rows)} benchmarks written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+from metrics import metrics
+
+
+# ✅ Scraping settings (override through the .env file)
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "3"))
+HEADLESS = os.getenv("HEADLESS", "false").lower() in ("1", "true", "yes")
+CHROME_PATH = os.getenv("CHROME_PATH", "C:/Program Files/Google/Chrome/Application/chrome.exe")
+
+CHROME_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--start-maximized",
+    "--disable-popup-blocking",
+    "--disable-renderer-backgrounding",
+    "--no-sandbox",
+]
+
+
+class BrowserPool:
+    """Keeps a single Chromium instance alive and lends out reusable pages."""
+
+    def __init__(self, concurrency=SCRAPE_CONCURRENCY, headless=HEADLESS, executable_path=CHROME_PATH):
+        self.concurrency = max(1, concurrency)
+        self.headless = headless
+        # Fall back to Playwright's bundled Chromium when Chrome isn't installed (e.g. on a server)
+        self.executable_path = executable_path if executable_path and os.path.exists(executable_path) else None
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._start_lock = asyncio.Lock()
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._idle_pages = []
+
+    @property
+    def running(self):
+        return self._browser is not None and self._browser.is_connected()
+
+    async def start(self):
+        """Launches the browser once. Safe to call again, e.g. on every on_ready."""
+        async with self._start_lock:
+            if self.running:
+                return
+
+            with metrics.span("browser_launch"):
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+
+                self._browser = await self._playwright.chromium.launch(
+                    headless=self.headless,
+                    executable_path=self.executable_path,
+                    args=CHROME_ARGS,
+                )
+                self._context = await self._browser.new_context()
+            self._idle_pages = []
+            mode = "headless" if self.headless else "visible"
+            print(f"✅ Browser pool started ({mode}, {self.concurrency} concurrent pages)")
+
+    async def stop(self):
+        """Closes the browser and the Playwright driver."""
+        async with self._start_lock:
+            if self._browser is not None:
+                try:
+                    await self._browser.close()
+                except Exception as e:
+                    print(f"⚠ Error closing browser: {e}")
+            if self._playwright is not None:
+                await self._playwright.stop()
+            self._playwright = None
+            self._browser = None
+            self._context = None
+            self._idle_pages = []
+            print("🔄 Browser pool stopped")
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrows a page from the pool, waiting if every slot is busy."""
+        async with self._semaphore:
+            # Relaunch if Chrome crashed or was closed by hand
+            await self.start()
+
+            page = self._idle_pages.pop() if self._idle_pages else await self._context.new_page()
+            try:
+                yield page
+            except BaseException:
+                # Don't hand a page in an unknown state to the next player
+                await self._discard(page)
+                raise
+            else:
+                if page.is_closed() or not self.running:
+                    return
+                self._idle_pages.append(page)
+
+    async def _discard(self, page):
+        try:
+            if not page.is_closed():
+                await page.close()
+        except Exception:
+            pass
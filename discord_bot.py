@@ -0,0 +1,724 @@
+import asyncio
+import random
+from collections import defaultdict
+import time
+import os
+import google.generativeai as genai
+import discord
+from discord.ext import commands
+import re
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from browser_pool import BrowserPool
+from fetcher import ProfileFetcher
+from stats_cache import StatsCache, normalize_riot_id
+from storage import BASE_DIR, PlayerStore, guild_folder, migrate_name_folder, player_key
+from roster_index import ROSTER_INDEX_TTL, RosterIndex
+from percentiles import PercentileIndex, STAT_LABELS, rank_players, sort_stat
+from scheduler import RefreshScheduler
+from jobs import GuildJobQueue, InFlight
+from ai import AI_CACHE_TTL, GeminiClient, build_prompt, prompt_key
+from balancer import FORM_WEIGHT, balance_lobbies, format_bench, format_teams
+from history import FORM_DAYS, format_history, recent_form
+from metrics import metrics
+from resilience import ResilientFetcher, ScrapeError, SharedCircuitBreaker, SharedScrapeState, SharedTokenBucket
+from scrape_workers import SCRAPE_WORKERS, ScrapeWorkerPool, scrape_profile_browser
+from sharding import SHARD_IDS, create_bot, runs_background_jobs
+
+
+TOKEN = os.getenv("DISCORD_TOKEN")
+GENAI_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+genai.configure(api_key=GENAI_API_KEY)
+
+# ✅ Gemini calls run async with a timeout and a concurrency cap (see ai.py for settings)
+gemini = GeminiClient()
+
+intents = discord.Intents.default()
+intents.message_content = True
+# ✅ Plain Bot, or AutoShardedBot when SHARD_MODE / SHARD_IDS are set (see sharding.py)
+bot = create_bot(command_prefix="v/", intents=intents)
+
+# ✅ Directory for storing data per server
+os.makedirs(BASE_DIR, exist_ok=True)
+
+# ✅ All servers' players live in one SQLite database (see storage.py)
+store = PlayerStore()
+
+# ✅ Percentiles of every stat over all stored players, updated on each save (see percentiles.py).
+#    Re-read every ROSTER_INDEX_TTL seconds when shard processes share the database
+percentiles = PercentileIndex(store, ttl=ROSTER_INDEX_TTL if SHARD_IDS else 0)
+
+# ✅ Each server's roster stays in memory once loaded, writes go through to the database.
+#    When shard processes share the database, rosters are reloaded every ROSTER_INDEX_TTL seconds
+#    to pick up refreshes written by the other processes
+roster_index = RosterIndex(store, percentiles=percentiles, ttl=ROSTER_INDEX_TTL if SHARD_IDS else 0)
+
+players = []
+
+# ✅ One long-lived Chrome shared by every scrape (see browser_pool.py for settings)
+browser_pool = BrowserPool()
+
+# ✅ Cheap HTTP lookups first, the browser pool only when tracker.gg needs a real browser.
+#    With SCRAPE_WORKERS set, that whole stack runs in separate processes (see scrape_workers.py)
+if SCRAPE_WORKERS:
+    fetcher = ScrapeWorkerPool()
+else:
+    fetcher = ProfileFetcher(browser_fallback=lambda player: scrape_player_browser(player))
+
+# ✅ Global rate limit, retries with backoff, and a circuit breaker when Cloudflare challenges spike
+#    (see resilience.py for settings). Shard processes share the limit and breaker through the database
+if SHARD_IDS:
+    scrape_state = SharedScrapeState(store.path)
+    scraper = ResilientFetcher(fetcher.fetch, SharedTokenBucket(scrape_state), SharedCircuitBreaker(scrape_state))
+else:
+    scraper = ResilientFetcher(fetcher.fetch)
+
+# ✅ Recently scraped stats shared by every server (see stats_cache.py for TTL/size)
+stats_cache = StatsCache()
+
+# ✅ v/st requests are merged per server, and each Riot ID is only scraped once at a time
+scrapes_in_flight = InFlight()
+scrape_jobs = GuildJobQueue(lambda guild, players: scrape_batch(guild, players))
+
+# ✅ Re-scrapes stale players off-peak (see scheduler.py for the window and rate limit)
+refresh_scheduler = RefreshScheduler(
+    store, lambda player: scrapes_in_flight.run(normalize_riot_id(player), lambda: fetch_player(player)), stats_cache,
+    on_refresh=roster_index.refresh,
+)
+
+# ✅ Queue depths and cache sizes, read whenever metrics are exported (see metrics.py)
+metrics.gauge("scrape_queue_depth", lambda: scrape_jobs.depth)
+metrics.gauge("scrapes_in_flight", lambda: len(scrapes_in_flight))
+metrics.gauge("refresh_queue_depth", lambda: refresh_scheduler.pending)
+metrics.gauge("stats_cache_entries", lambda: len(stats_cache))
+metrics.gauge("roster_index_guilds", lambda: len(roster_index))
+metrics.gauge("percentile_index_rows", lambda: len(percentiles))
+metrics.gauge("scrape_breaker_open", lambda: scraper.breaker.is_open)
+metrics.gauge("scrape_rate_tokens", lambda: scraper.bucket.tokens)
+if SCRAPE_WORKERS:
+    metrics.gauge("scrape_worker_jobs", lambda: fetcher.pending)
+metrics_tasks = []
+
+DISCORD_LIMIT = 2000  # Characters per message
+
+
+def paginate(blocks, limit=DISCORD_LIMIT):
+    """Packs text blocks into as few messages as possible, each under Discord's length limit.
+
+    A block is never split across messages unless it's longer than a message by itself.
+    """
+    pages, current = [], ""
+    for block in blocks:
+        while len(block) > limit:
+            cut = block.rfind("\n", 0, limit)
+            cut = cut if cut > 0 else limit
+            pieces = [block[:cut], block[cut:].lstrip("\n")]
+            if current:
+                pages.append(current)
+                current = ""
+            pages.append(pieces[0])
+            block = pieces[1]
+        if current and len(current) + 1 + len(block) > limit:
+            pages.append(current)
+            current = ""
+        current = f"{current}\n{block}" if current else block
+    if current:
+        pages.append(current)
+    return pages
+
+
+def stats_block(stats, note=None):
+    """One player's stats as shown by v/st."""
+    lines = [f"✅ **Stats for {stats.username}:**"]
+    if note:
+        lines.append(note)
+    lines += [f"🔹 {stat}: {value}" for stat, value in stats.display_items()]
+    return "\n".join(lines)
+
+
+def sanitize_filename(name):
+    """Removes special characters to create a valid filename."""
+    return re.sub(r'[<>:"/\\|?*]', '', name)
+
+async def import_legacy_data(guild):
+    """Imports the server's old JSON/CSV files into the database (only done once per server).
+
+    Old folders were named after the server (server_data/<name>/), they're moved to
+    server_data/<guild id>/ first so renames and look-alike names can't mix data up.
+    """
+    name_path = os.path.join(BASE_DIR, sanitize_filename(guild.name))
+    migrated = await asyncio.to_thread(migrate_name_folder, name_path, guild.id)
+    if migrated:
+        print(f"📁 Moved '{name_path}' to '{migrated}' for server: '{guild.name}'")
+
+    server_path = guild_folder(guild.id)
+    imported = await store.import_legacy_folder(guild.id, server_path)
+    if imported:
+        print(f"✅ Imported {len(imported)} players from '{server_path}' for server: '{guild.name}'")
+        # The import wrote straight to the database, bypassing the in-memory indexes
+        roster_index.invalidate(guild.id)
+        await percentiles.resync(imported)
+
+# ✅ Per-server setup runs on the server's first command instead of for every server at startup
+ready_guilds = set()
+guild_setup = InFlight()
+
+async def ensure_guild_ready(guild):
+    if guild.id in ready_guilds:
+        return
+    await guild_setup.run(guild.id, lambda: import_legacy_data(guild))
+    ready_guilds.add(guild.id)
+
+async def scrape_player_browser(player):
+    """Scrapes a single player's tracker.gg profile using a page from the browser pool."""
+    return await scrape_profile_browser(browser_pool, player)
+
+
+async def fetch_player(player):
+    """Gets a player's stats over plain HTTP when possible, the browser is only used as a fallback."""
+    print(f"\n🔹 **Scraping stats for {player}...**")
+
+    stats = await scraper.fetch(player)
+    stats_cache.put(player, stats)
+    await store.add_snapshot(stats)
+    return stats
+
+
+async def scrape_player(player):
+    """Returns a player's stats from the shared cache, or scrapes them. Raises ScrapeError on failure.
+
+    Concurrent lookups of the same Riot ID, from any server, share a single scrape.
+    """
+    stats = stats_cache.get(player)
+    if stats is not None:
+        # ✅ Another server already looked this player up recently, no need to scrape
+        metrics.inc("stats_cache_hits_total")
+        print(f"♻ **Using cached stats for {player}**")
+    else:
+        metrics.inc("stats_cache_misses_total")
+        stats = await scrapes_in_flight.run(normalize_riot_id(player), lambda: fetch_player(player))
+    return stats.copy(username=player)
+
+
+async def saved_stats_fallback(player, error):
+    """While tracker.gg blocks us, reuses the last stats saved for this player by any server."""
+    if error.kind not in (ScrapeError.PAUSED, ScrapeError.CHALLENGE):
+        return None, f"❌ **{player}:** {error.reason}"
+
+    saved = await store.latest_player(player)
+    if saved is None:
+        return None, f"❌ **{player}:** {error.reason}"
+    stats, updated_at = saved
+    day = time.strftime("%Y-%m-%d", time.localtime(updated_at))
+    return stats.copy(username=player), f"♻ **{player}:** using saved stats from {day} ({error.reason})"
+
+
+async def scrape_batch(guild, requests: list):
+    """Adds every player requested by the queued v/st calls of one server in a single pass.
+
+    requests is [(player, on_result)]. on_result(key, stats, note) is called as soon as
+    each player is ready (stats is None if they couldn't be scraped, note says why),
+    so v/st can show results before the whole batch is done. It may be None.
+
+    Returns ({key: PlayerStats} of the players added by this batch, {key: message} for
+    the players that couldn't be scraped). The added players are returned directly: the
+    roster dict read before scraping may have been evicted and reloaded in the meantime.
+    """
+    index = await roster_index.roster(guild.id)
+
+    listeners = defaultdict(list)
+    to_scrape = {}
+    for player, on_result in requests:
+        key = player_key(player)
+        if on_result is not None:
+            listeners[key].append(on_result)
+        if key in index:
+            print(f"⚠ **{player} already exists!** Skipping...")
+        elif key not in to_scrape:
+            to_scrape[key] = player
+
+    def notify(key, stats, note):
+        for on_result in listeners.get(key, ()):
+            on_result(key, stats, note)
+
+    for key in listeners:
+        if key in index:
+            notify(key, index[key], None)
+
+    async def scrape_one(key, player):
+        note = None
+        try:
+            stats = await scrape_player(player)
+        except ScrapeError as e:
+            stats, note = await saved_stats_fallback(player, e)
+        except Exception as e:
+            print(f"❌ **Error scraping {player}:** {e}")
+            stats, note = None, f"❌ **{player}:** unexpected error"
+        notify(key, stats, note)
+        return stats, note
+
+    # ✅ Scrape in parallel, the fetcher and browser pool cap the real concurrency
+    results = await asyncio.gather(*(scrape_one(key, player) for key, player in to_scrape.items()))
+    new_data = [stats for stats, _ in results if stats is not None]
+    failures = {key: note for key, (_, note) in zip(to_scrape, results) if note is not None}
+
+    # ✅ Only the write holds the server's lock, v/r and v/clear don't wait for the scraping
+    async with scrape_jobs.lock(guild.id):
+        await save_to_files(new_data, guild)
+    return {player_key(stats.username): stats for stats in new_data}, failures
+
+
+async def scrape(ctx, players: list, on_result=None):
+    """Scrapes player stats and saves only new players to the server's dataset.
+
+    Requests from the same server are queued and merged, so simultaneous v/st calls
+    never scrape the same player twice or overwrite each other's additions.
+    on_result is passed to scrape_batch to stream each player's result.
+    """
+    added, failures = await scrape_jobs.submit(ctx.guild, [(p, on_result) for p in players])
+
+    requested = dict.fromkeys(player_key(player) for player in players)
+    new_data = [added[key] for key in requested if key in added]
+
+    for stats in new_data:
+        if stats.private:
+            print(f"⚠ **{stats.username} has a private profile! Stats cannot be retrieved.**")
+            await ctx.send(f"⚠ **{stats.username} has a private profile! Stats cannot be retrieved.**")
+
+    # ✅ Tell the user why each player failed instead of silently dropping them (unless streamed already)
+    notes = [failures[key] for key in requested if key in failures]
+    if notes and on_result is None:
+        for page in paginate(["⚠ **Some players could not be scraped:**", *notes]):
+            await ctx.send(page)
+
+    if new_data:
+        for page in paginate([f"✅ **New players added!**\n{', '.join([p.username for p in new_data])}"]):
+            await ctx.send(page)
+    elif not notes:
+        await ctx.send("⚠ **No new data added.** All players already exist.")
+
+    return new_data
+
+
+async def save_to_files(scraped_data, guild):
+    """Saves (inserts or updates) only the given players, in the roster index and the database."""
+    if scraped_data:
+        await roster_index.upsert(guild.id, scraped_data)
+        print(f"✅ Data saved for server: '{guild.name}'")
+
+
+async def analyze_with_ai(guild, split):
+    """Asks Gemini for a short commentary on teams already built by the local balancer.
+
+    Answers are cached per server by prompt hash, so an unchanged roster doesn't cost a new call.
+    """
+    prompt = build_prompt(split)
+    key = prompt_key(prompt)
+
+    cached = await store.get_ai_response(guild.id, key, AI_CACHE_TTL)
+    if cached is not None:
+        metrics.inc("ai_cache_hits_total")
+        print(f"♻ **Using cached AI analysis for server: '{guild.name}'**")
+        return cached
+    metrics.inc("ai_cache_misses_total")
+
+    try:
+        ai_analysis = await gemini.generate(prompt)
+        if not ai_analysis:
+            return "⚠ No response received from the AI."
+
+        print("\n🎯 **AI Analysis (Gemini) :**\n" + ai_analysis)
+
+        await store.put_ai_response(guild.id, key, ai_analysis, AI_CACHE_TTL)
+        return ai_analysis
+
+    except asyncio.TimeoutError:
+        print(f"⚠ Gemini did not answer within {gemini.timeout:.0f}s")
+        return "⚠ AI analysis timed out."
+    except Exception as e:
+        print(f"⚠ Error generating AI response: {e}")
+        return "⚠ AI analysis failed."
+
+async def load_form(players):
+    """Recent form of the given players, from their stats history over the last FORM_DAYS."""
+    since = time.time() - FORM_DAYS * 86400
+    pairs = await store.form_snapshots([p.username for p in players], since)
+    form = {username: recent_form(old, new) for username, (old, new) in pairs.items()}
+    return {username: stats for username, stats in form.items() if stats}
+
+async def load_existing_data(guild):
+    """The player stats of the current server, from the in-memory roster index."""
+    return await roster_index.players(guild.id)
+
+
+@bot.command(name="gt")
+async def generate_teams(ctx, *options: str):
+    """Generates balanced teams from the server database.
+
+    `v/gt` makes 5v5 lobbies, `v/gt 3` makes 3v3 lobbies. With more players than one lobby,
+    parallel lobbies are filled and the latest sign-ups go to the bench.
+    Add `ai` (e.g. `v/gt ai`) to also ask Gemini for a commentary on the generated teams.
+    """
+    team_size = 5
+    use_ai = False
+    for option in options:
+        if option.lower() == "ai":
+            use_ai = True
+        elif option.isdigit() and int(option) > 0:
+            team_size = int(option)
+        else:
+            await ctx.send(f"⚠ **Unknown option `{option}`.** Example: `v/gt`, `v/gt 5`, `v/gt 5 ai`")
+            return
+
+    existing_data = await load_existing_data(ctx.guild)
+
+    if len(existing_data) < team_size * 2:
+        await ctx.send(f"⚠ **You need at least {team_size * 2} players to generate {team_size}v{team_size} teams.**\n"
+                       f"Currently available: **{len(existing_data)}**\n"
+                       f"Use `v/st <player>` to add more players.")
+        return
+
+    # ✅ Players who have been playing a lot better (or worse) lately are rated accordingly
+    form = await load_form(existing_data) if FORM_WEIGHT > 0 else {}
+
+    # The heuristic search on big lobbies can take around half a second, keep it off the event loop
+    # ✅ Players are rated on their percentile among every stored player, not raw stats
+    await percentiles.load()
+    plan = await asyncio.to_thread(balance_lobbies, existing_data, team_size, form=form, percentiles=percentiles)
+    multiple = len(plan.lobbies) > 1
+    if form:
+        await ctx.send(f"📈 **Recent form (last {FORM_DAYS:g} days) weighted in for {len(form)} player(s).**")
+
+    await ctx.send(f"🎯 **Generated Teams:** {len(plan.lobbies)} lobby(s) of {team_size}v{team_size}")
+    for number, split in enumerate(plan.lobbies, start=1):
+        teams_text = format_teams(split, f"⚔ Lobby {number}" if multiple else "")
+        await ctx.send(f"```{teams_text}```")
+
+        if use_ai:
+            await ctx.send("🤖 **Asking the AI for a commentary... Please wait!**")
+            result = await analyze_with_ai(ctx.guild, split)
+            await ctx.send(f"🤖 **AI Commentary:**\n```{result}```")
+
+    if plan.bench:
+        await ctx.send(format_bench(plan.bench))
+
+
+@bot.command(name="st")
+async def scrape_command(ctx, *, players: str):
+    formatted_players = [player.strip() for player in players.split(",") if player.strip()]
+    if not formatted_players:
+        await ctx.send("⚠ **Enter at least one player name!** Example: `v/st Player#1234`")
+        return
+
+    expected = len({player_key(player) for player in formatted_players})
+    # Long player lists are cut to the first page so the progress line still fits
+    header = paginate([f"🔄 **Checking stats for:** {', '.join(formatted_players)}"], DISCORD_LIMIT - 40)[0]
+    progress = await ctx.send(f"{header}\n(0/{expected} ready)")
+
+    # ✅ Results are sent as each player finishes instead of after the whole batch
+    results = asyncio.Queue()
+    job = asyncio.ensure_future(
+        scrape(ctx, formatted_players, on_result=lambda key, stats, note: results.put_nowait((key, stats, note)))
+    )
+
+    seen = set()
+    failed = 0
+    while len(seen) < expected:
+        getter = asyncio.ensure_future(results.get())
+        await asyncio.wait({getter, job}, return_when=asyncio.FIRST_COMPLETED)
+        if getter.done():
+            ready = [getter.result()]
+        else:
+            getter.cancel()
+            if results.empty():
+                break  # The batch ended (or failed) without reporting everyone
+            ready = []
+
+        # Send everything that is ready now together, in as few messages as possible
+        while not results.empty():
+            ready.append(results.get_nowait())
+
+        blocks = []
+        for key, stats, note in ready:
+            if key in seen:
+                continue
+            seen.add(key)
+            if stats is None:
+                failed += 1
+                blocks.append(note)
+            else:
+                blocks.append(stats_block(stats, note))
+        for page in paginate(blocks):
+            await ctx.send(page)
+        await progress.edit(content=f"{header}\n({len(seen)}/{expected} ready)")
+
+    try:
+        await job
+    except Exception as e:
+        print(f"❌ **Error adding players for server '{ctx.guild.name}':** {e}")
+        await ctx.send("⚠ **Scraping failed!** Please try again later.")
+        return
+
+    done = f"✅ **Done:** {len(seen) - failed}/{expected} ready"
+    if failed:
+        done += f", {failed} could not be scraped"
+    await progress.edit(content=done)
+
+
+@bot.command(name="r")
+async def remove_player(ctx, *, player: str):
+    """Removes a player from the saved stats of the current server."""
+    async with scrape_jobs.lock(ctx.guild.id):
+        removed = await roster_index.remove(ctx.guild.id, player.strip())
+
+    if removed:
+        await ctx.send(f"✅ **{player} has been removed from the stats!**")
+    else:
+        await ctx.send(f"⚠ **{player} not found in the saved stats!**")
+
+
+bot.remove_command("help")
+@bot.command(name="help", aliases=["commands"])
+async def help_command(ctx):
+    embed = discord.Embed(
+        title="Commands - ValoCustom",
+        description="Here are all available commands:",
+        color=discord.Color.red()
+    )
+    embed.add_field(
+        name="`v/st player#TAG,...`",
+        value="➜ Add player(s) to the list. Need 10 players to start a custom match (20 for two lobbies...).",
+        inline=False
+    )
+    embed.add_field(
+        name="`v/gt [team size] [ai]`",
+        value="➜ Generate team arrangement (5v5 by default). Extra players fill parallel lobbies or the bench. Add `ai` for an AI commentary.",
+        inline=False
+    )
+    embed.add_field(
+        name="`v/r player#TAG`",
+        value="➜ Remove a player from the list.",
+        inline=False
+    )
+    embed.add_field(
+        name="`v/clear`",
+        value="➜ Clear the entire player list.",
+        inline=False
+    )
+    embed.add_field(
+        name="`v/sl [stat] [count]`",
+        value="➜ Show the player list, or rank it by a stat (e.g. `v/sl acs 10` for the top 10 ACS).",
+        inline=False
+    )
+    embed.add_field(
+        name="`v/refresh [player#TAG,...]`",
+        value="➜ Refresh the stats of the given players (or the whole list).",
+        inline=False
+    )
+    embed.add_field(
+        name="`v/export`",
+        value="➜ Download the player list as JSON and CSV.",
+        inline=False
+    )
+    embed.add_field(
+        name="`v/history player#TAG [days]`",
+        value="➜ Show how a player's rank, ACS, K/D... evolved (all time by default).",
+        inline=False
+    )
+    embed.add_field(
+        name="`v/stats`",
+        value="➜ (Admins) Scraping latencies, cache hit rates and queue depths.",
+        inline=False
+    )
+    await ctx.send(embed=embed)
+
+
+@bot.command(name="clear")
+async def clear_data(ctx):
+    """Clears all player stats for the current server."""
+    # Supprime toutes les lignes du serveur dans la base
+    async with scrape_jobs.lock(ctx.guild.id):
+        await roster_index.clear(ctx.guild.id)
+
+    await ctx.send(f"✅ **All player stats have been cleared for this server!**")
+    print(f"🔄 **Data cleared for server: {ctx.guild.name}**")
+
+
+def format_ranking(ranked, attr):
+    """One line per player: position, name, value and percentile among all stored players."""
+    label = STAT_LABELS[attr]
+    lines = []
+    for position, (p, value) in enumerate(ranked, start=1):
+        shown = p.rank if attr == "rank_ordinal" else p.display(label)
+        percentile = percentiles.percentile(attr, value)
+        lines.append(f"{position}. {p.username}: {shown}"
+                     + (f" (top {max(1, round(100 * (1 - percentile)))}%)" if percentile is not None else ""))
+    return lines
+
+
+@bot.command(name="sl")
+async def show_list(ctx, *options: str):
+    """Displays the list of players currently saved for the server.
+
+    `v/sl acs` ranks them by a stat, `v/sl acs 10` only shows the top 10.
+    """
+    attr, limit = None, None
+    for option in options:
+        if option.isdigit() and int(option) > 0:
+            limit = int(option)
+        elif sort_stat(option) is not None:
+            attr = sort_stat(option)
+        else:
+            await ctx.send(f"⚠ **Unknown stat `{option}`.** Example: `v/sl`, `v/sl acs`, `v/sl kd 10`")
+            return
+
+    if attr is None:
+        players = await roster_index.usernames(ctx.guild.id)
+        if players:
+            await ctx.send(f"📊 **Current Player List:**\n{', '.join(players)}"
+                           f"\n\n**Total Players:** {len(players)}")
+        else:
+            await ctx.send("⚠ **No players found in the list!**")
+        return
+
+    players = await roster_index.players(ctx.guild.id)
+    ranked = rank_players(players, attr, limit)
+    if not ranked:
+        await ctx.send(f"⚠ **No players with a {STAT_LABELS[attr]} in the list!**")
+        return
+
+    await percentiles.load()
+    title = f"📊 **{'Top ' + str(len(ranked)) if limit else 'Players'} by {STAT_LABELS[attr]}:**"
+    for page in paginate([title, *format_ranking(ranked, attr)]):
+        await ctx.send(page)
+
+
+@bot.command(name="refresh")
+async def refresh_players(ctx, *, players: str = ""):
+    """Queues players of this server for a stats refresh (all of them if no name is given)."""
+    roster = await roster_index.roster(ctx.guild.id)
+
+    if players.strip():
+        requested = [p.strip() for p in players.split(",") if p.strip()]
+        missing = [p for p in requested if player_key(p) not in roster]
+        if missing:
+            await ctx.send(f"⚠ **Not in the saved stats:** {', '.join(missing)}")
+        targets = [roster[player_key(p)].username for p in requested if player_key(p) in roster]
+    else:
+        targets = [p.username for p in roster.values()]
+
+    if not targets:
+        await ctx.send("⚠ **No players to refresh!**")
+        return
+
+    queued = sum(refresh_scheduler.enqueue(p) for p in targets)
+    await ctx.send(f"🔄 **Queued {queued} player(s) for refresh.** "
+                   f"({len(targets) - queued} already queued, {refresh_scheduler.pending} waiting in total)")
+
+
+@bot.command(name="export")
+async def export_data(ctx):
+    """Exports the server's player stats as JSON and CSV files."""
+    json_path, csv_path = await store.export(ctx.guild.id, guild_folder(ctx.guild.id), "players")
+    await ctx.send("📤 **Exported player stats:**", files=[discord.File(json_path), discord.File(csv_path)])
+
+
+@bot.command(name="history")
+async def show_history(ctx, *, query: str = ""):
+    """Shows a player's stats trends from the snapshots taken at every scrape."""
+    match = re.fullmatch(r"(.+?)(?:\s+(\d+))?", query.strip())
+    if not match:
+        await ctx.send("⚠ **Enter a player name!** Example: `v/history Player#1234` or `v/history Player#1234 30`")
+        return
+    player, days = match.group(1).strip(), int(match.group(2)) if match.group(2) else None
+
+    since = time.time() - days * 86400 if days else 0
+    snapshots = await store.history(player, since)
+    if not snapshots:
+        await ctx.send(f"⚠ **No history for {player} yet.** Stats are recorded each time the player is scraped.")
+        return
+
+    for page in paginate([format_history(player, snapshots, days)], DISCORD_LIMIT - 40):
+        await ctx.send(f"📈 **Stats history:**\n```\n{page}\n```")
+
+
+def format_rate(rate):
+    return "N/A" if rate is None else f"{rate:.0%}"
+
+
+@bot.command(name="stats")
+@commands.has_permissions(administrator=True)
+async def show_stats(ctx):
+    """Shows scraping latencies, cache hit rates and queue depths (admins only)."""
+    await scraper.breaker.sync()  # Trips by other shard processes
+    lines = [f"{'Operation':<28}{'Count':>7}{'Errors':>7}{'p50 ms':>9}{'p95 ms':>9}"]
+    for name, labels, count, errors, p50, p95 in metrics.timing_summary():
+        label = name + "".join(f" {v}" for _, v in sorted(labels.items()))
+        lines.append(f"{label[:27]:<28}{count:>7}{errors:>7.0f}{p50 * 1000:>9.0f}{p95 * 1000:>9.0f}")
+    if len(lines) == 1:
+        lines.append("(nothing timed yet)")
+
+    lines += [
+        "",
+        f"Stats cache hit rate: {format_rate(metrics.hit_rate('stats_cache_hits_total', 'stats_cache_misses_total'))}"
+        f" ({len(stats_cache)} entries)",
+        f"AI cache hit rate:    {format_rate(metrics.hit_rate('ai_cache_hits_total', 'ai_cache_misses_total'))}",
+        f"Cloudflare challenges: {metrics.counter('cloudflare_challenges_total'):.0f}, "
+        f"retries: {metrics.counter('scrape_retries_total'):.0f}",
+        f"Circuit breaker: {f'open, {scraper.breaker.remaining:.0f}s left' if scraper.breaker.is_open else 'closed'}"
+        f" ({metrics.counter('breaker_trips_total'):.0f} trips)",
+        f"Scrape queue: {scrape_jobs.depth} waiting, {len(scrapes_in_flight)} in flight",
+        f"Refresh queue: {refresh_scheduler.pending} waiting",
+    ]
+    if SCRAPE_WORKERS:
+        lines.append(f"Scrape workers: {fetcher.processes} process(es), {fetcher.pending} job(s) pending")
+    if ctx.guild.shard_id is not None and bot.shard_count:
+        lines.append(f"Shard: {ctx.guild.shard_id} of {bot.shard_count}, {len(bot.guilds)} servers in this process")
+
+    text = "\n".join(lines)
+    if len(text) > 1900:
+        text = text[:1900] + "\n..."
+    await ctx.send(f"📈 **Bot stats:**\n```\n{text}\n```")
+
+
+@show_stats.error
+async def show_stats_error(ctx, error):
+    if isinstance(error, commands.MissingPermissions):
+        await ctx.send("⚠ **Only server admins can use this command.**")
+    else:
+        raise error
+
+
+@bot.before_invoke
+async def prepare_guild(ctx):
+    """Imports the server's legacy files before its first command runs."""
+    if ctx.guild is not None:
+        await ensure_guild_ready(ctx.guild)
+
+
+@bot.event
+async def on_guild_join(guild):
+    """Triggered when the bot joins a new server."""
+    print(f"🔹 Bot joined a new server: {guild.name} (ID: {guild.id})")
+
+
+@bot.event
+async def on_ready():
+    print(f"✅ Bot is ready! Logged in as {bot.user} ({len(bot.guilds)} servers)")
+    if SCRAPE_WORKERS:
+        fetcher.start()
+    else:
+        await browser_pool.start()
+    # ✅ Every process drains its own v/refresh queue, only shard 0 scans for stale players
+    refresh_scheduler.start(scan=runs_background_jobs())
+    # ✅ Pre-warm the percentile index so the first v/gt or v/sl doesn't wait for it
+    asyncio.ensure_future(percentiles.load())
+    if not metrics_tasks:
+        metrics_tasks.extend(metrics.start())
+
+
+def main():
+    bot.run(TOKEN)
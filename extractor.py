@@ -0,0 +1,126 @@
+from html.parser import HTMLParser
+from models import PlayerStats
+
+
+# Selectors shared by the in-page script and the static parser below
+RANK_SELECTOR = ".rating-entry__rank-info .value"
+PRIVATE_BANNER_SELECTOR = "span.font-light.font-stylized.text-40.uppercase"
+STATS_SELECTOR = ".numbers"
+READY_SELECTOR = f"{STATS_SELECTOR}, {PRIVATE_BANNER_SELECTOR}"
+
+# ✅ Reads rank, private banner and every stat block in a single page.evaluate() round-trip
+EXTRACT_JS = f"""
+() => {{
+    const text = (el) => (el && el.textContent ? el.textContent.replace(/\\s+/g, " ").trim() : "");
+    const stats = [];
+    for (const block of document.querySelectorAll("{STATS_SELECTOR}")) {{
+        const name = text(block.querySelector(".name"));
+        const value = block.querySelector(".value");
+        if (name && value) stats.push([name, text(value)]);
+    }}
+    const rank = document.querySelector("{RANK_SELECTOR}");
+    return {{
+        rank: rank ? text(rank) : null,
+        private_message: text(document.querySelector("{PRIVATE_BANNER_SELECTOR}")).toLowerCase(),
+        stats: stats,
+    }};
+}}
+"""
+
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+PRIVATE_BANNER_CLASSES = {"font-light", "font-stylized", "text-40", "uppercase"}
+
+
+class _ProfileHTMLParser(HTMLParser):
+    """Static-HTML twin of EXTRACT_JS, for fetched pages and saved snapshots."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []            # [(tag, classes)]
+        self.capture = None        # (kind, depth) of the element whose text we're reading
+        self.buffer = []
+        self.rank = None
+        self.private_message = ""
+        self.stats = []            # [[name, value]]
+        self.block = None          # Current .numbers block: {"name": ..., "value": ...}
+        self.block_depth = None
+
+    def _inside(self, cls):
+        return any(cls in classes for _, classes in self.stack)
+
+    def handle_starttag(self, tag, attrs):
+        classes = set((dict(attrs).get("class") or "").split())
+        if tag in VOID_TAGS:
+            return
+        self.stack.append((tag, classes))
+        depth = len(self.stack)
+
+        if "numbers" in classes and self.block is None:
+            self.block, self.block_depth = {}, depth
+        if self.capture is not None:
+            return
+        if self.block is not None and ("name" in classes or "value" in classes):
+            self.capture = ("name" if "name" in classes else "value", depth)
+        elif "value" in classes and self.rank is None and self._inside("rating-entry__rank-info"):
+            self.capture = ("rank", depth)
+        elif tag == "span" and PRIVATE_BANNER_CLASSES <= classes and not self.private_message:
+            self.capture = ("private", depth)
+        if self.capture is not None:
+            self.buffer = []
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        # Tolerate unclosed tags: pop until we find the matching one
+        while self.stack:
+            open_tag, _ = self.stack.pop()
+            depth = len(self.stack) + 1
+            self._close(depth)
+            if open_tag == tag:
+                break
+
+    def _close(self, depth):
+        if self.capture is not None and self.capture[1] == depth:
+            kind, text = self.capture[0], " ".join("".join(self.buffer).split())
+            self.capture = None
+            if kind == "rank":
+                self.rank = text
+            elif kind == "private":
+                self.private_message = text.lower()
+            elif self.block is not None:
+                self.block.setdefault(kind, text)
+        if self.block is not None and self.block_depth == depth:
+            if self.block.get("name") and "value" in self.block:
+                self.stats.append([self.block["name"], self.block["value"]])
+            self.block, self.block_depth = None, None
+
+    def handle_data(self, data):
+        if self.capture is not None:
+            self.buffer.append(data)
+
+
+def extract_html(html):
+    """Runs the extraction on static HTML. Returns the same payload as EXTRACT_JS."""
+    parser = _ProfileHTMLParser()
+    parser.feed(html)
+    parser.close()
+    return {"rank": parser.rank, "private_message": parser.private_message, "stats": parser.stats}
+
+
+async def extract_page(page):
+    """Runs the extraction inside a live Playwright page in one round-trip."""
+    return await page.evaluate(EXTRACT_JS)
+
+
+def payload_to_stats(player, payload):
+    """Turns an extraction payload into PlayerStats. Returns None if the page had no stats."""
+    if f"{player.lower()}'s profile is private." in (payload.get("private_message") or ""):
+        return PlayerStats.private_profile(player)
+    if not payload.get("stats"):
+        return None
+
+    raw = {"Username": player, "Rank": payload.get("rank") or "N/A"}
+    for name, value in payload["stats"]:
+        raw[name] = value
+    return PlayerStats.from_dict(raw)
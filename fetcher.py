@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+from urllib.parse import quote
+import aiohttp
+from extractor import extract_html, payload_to_stats
+from metrics import metrics
+from models import STAT_FIELDS, PlayerStats
+from resilience import ScrapeError
+
+
+# ✅ HTTP fetch settings (override through the .env file)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))  # seconds
+HTTP_CONCURRENCY = int(os.getenv("HTTP_CONCURRENCY", "10"))
+
+API_URL = "https://api.tracker.gg/api/v2/valorant/standard/profile/riot/{}"
+PAGE_URL = "https://tracker.gg/valorant/profile/riot/{}/overview"
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    ),
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+CLOUDFLARE_TEXTS = ["verify you are human", "just a moment...", "checking your browser", "cf-chl-"]
+
+
+class ChallengeError(Exception):
+    """tracker.gg answered with a Cloudflare challenge instead of the profile."""
+
+
+class UnparseableError(Exception):
+    """The response didn't contain the stats we expected."""
+
+
+def is_challenge(status, text):
+    """True if the response is a Cloudflare check page."""
+    if status in (403, 429, 503):
+        return True
+    lowered = text[:20000].lower()
+    return any(marker in lowered for marker in CLOUDFLARE_TEXTS)
+
+
+def riot_id_path(player):
+    """'Name#TAG' -> 'Name%23TAG' (URL-safe, spaces included)."""
+    return quote(player.strip(), safe="")
+
+
+# ---------- JSON API ----------
+
+def parse_api_profile(player, payload, status=200):
+    """Builds PlayerStats from a tracker.gg API response. Raises UnparseableError if it's not a profile."""
+    if not isinstance(payload, dict):
+        raise UnparseableError("API response is not a JSON object")
+
+    errors = payload.get("errors") or []
+    if any("private" in f"{e.get('code', '')} {e.get('message', '')}".lower() for e in errors) or status == 451:
+        return PlayerStats.private_profile(player)
+    if errors:
+        raise UnparseableError(errors[0].get("message") or "API returned an error")
+
+    segments = (payload.get("data") or {}).get("segments") or []
+    # The overview page shows competitive stats, prefer that playlist
+    segment = next(
+        (s for s in segments if s.get("type") == "playlist" and (s.get("attributes") or {}).get("playlist") == "competitive"),
+        None,
+    ) or next((s for s in segments if s.get("type") in ("playlist", "season")), None)
+    if segment is None:
+        raise UnparseableError("No stats segment in API response")
+
+    raw = {"Username": player, "Rank": "N/A"}
+    for key, stat in (segment.get("stats") or {}).items():
+        if key == "rank":
+            raw["Rank"] = (stat.get("metadata") or {}).get("tierName") or "N/A"
+            continue
+        label = stat.get("displayName")
+        if label in STAT_FIELDS:
+            raw[label] = stat.get("value") if stat.get("value") is not None else stat.get("displayValue")
+
+    if len(raw) <= 2:
+        raise UnparseableError("API segment has no known stats")
+    return PlayerStats.from_dict(raw)
+
+
+# ---------- HTML page ----------
+
+def parse_profile_html(player, html):
+    """Builds PlayerStats from a saved/fetched profile page. Raises UnparseableError if no stats are found."""
+    stats = payload_to_stats(player, extract_html(html))
+    if stats is None:
+        raise UnparseableError("No .numbers blocks in page")
+    return stats
+
+
+def failure_from(errors):
+    """Turns the errors of every HTTP tier into one ScrapeError explaining why the lookup failed."""
+    if any(isinstance(e, ChallengeError) for e in errors):
+        return ScrapeError("blocked by a Cloudflare check", ScrapeError.CHALLENGE)
+    if any(isinstance(e, asyncio.TimeoutError) for e in errors):
+        return ScrapeError("tracker.gg timed out", ScrapeError.TIMEOUT)
+    if errors and all(isinstance(e, UnparseableError) for e in errors):
+        return ScrapeError(f"no stats found, check the Riot ID ({errors[0]})", ScrapeError.NOT_FOUND)
+    return ScrapeError(f"connection error ({errors[-1] or type(errors[-1]).__name__})" if errors else "no fetcher tier")
+
+
+# ---------- Tiered fetcher ----------
+
+class ProfileFetcher:
+    """Fetches a profile over plain HTTP first (API, then page), and only falls back to the browser when needed.
+
+    browser_fallback is a coroutine function (player) -> PlayerStats that raises ScrapeError.
+    The URL templates can point at a local server to run against saved fixtures.
+    """
+
+    def __init__(self, browser_fallback=None, api_url=API_URL, page_url=PAGE_URL,
+                 timeout=HTTP_TIMEOUT, concurrency=HTTP_CONCURRENCY):
+        self.browser_fallback = browser_fallback
+        self.api_url = api_url
+        self.page_url = page_url
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self._session = None
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=HEADERS,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get(self, url, accept):
+        session = await self._get_session()
+        async with session.get(url, headers={"Accept": accept}) as response:
+            return response.status, await response.text()
+
+    async def fetch_api(self, player):
+        status, text = await self._get(self.api_url.format(riot_id_path(player)), "application/json")
+        if is_challenge(status, text):
+            raise ChallengeError(f"API challenge (HTTP {status})")
+        try:
+            payload = json.loads(text)
+        except ValueError:
+            raise UnparseableError(f"API returned non-JSON (HTTP {status})")
+        return parse_api_profile(player, payload, status)
+
+    async def fetch_page(self, player):
+        status, text = await self._get(self.page_url.format(riot_id_path(player)), "text/html")
+        if is_challenge(status, text):
+            raise ChallengeError(f"Page challenge (HTTP {status})")
+        return parse_profile_html(player, text)
+
+    async def fetch(self, player):
+        """Returns PlayerStats. Raises ScrapeError with the reason if every tier failed."""
+        errors = []
+        for name, tier in (("api", self.fetch_api), ("page", self.fetch_page)):
+            try:
+                with metrics.span("http_fetch", tier=name):
+                    stats = await tier(player)
+                print(f"⚡ **Fetched {player} over HTTP** ({name})")
+                metrics.inc("fetch_total", source=name)
+                return stats
+            except (ChallengeError, UnparseableError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                errors.append(e)
+                metrics.inc("fetch_fallbacks_total", tier=name, reason=type(e).__name__)
+                print(f"🔸 {name} fetch failed for {player}: {e or type(e).__name__}")
+
+        if self.browser_fallback is None:
+            metrics.inc("fetch_total", source="failed")
+            raise failure_from(errors)
+        print(f"🔹 **Falling back to the browser for {player}...**")
+        try:
+            with metrics.span("browser_scrape"):
+                stats = await self.browser_fallback(player)
+        except ScrapeError:
+            metrics.inc("fetch_total", source="failed")
+            raise
+        metrics.inc("fetch_total", source="browser")
+        return stats
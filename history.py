@@ -0,0 +1,122 @@
+import os
+import time
+from models import rank_label
+
+
+# ✅ History settings (override through the .env file)
+FORM_DAYS = float(os.getenv("FORM_DAYS", "14"))  # Window used for recent form
+FORM_MIN_ROUNDS = float(os.getenv("FORM_MIN_ROUNDS", "48"))  # Fewer rounds played in the window = no recent form
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+SPARK_WIDTH = 20
+
+# (label, PlayerStats attribute, format) shown by v/history
+TREND_STATS = [
+    ("Rank", "rank_ordinal", None),
+    ("ACS", "acs", "{:.1f}"),
+    ("K/D", "kd_ratio", "{:.2f}"),
+    ("Win %", "win_pct", "{:.1f}"),
+    ("DMG/Rnd", "damage_per_round", "{:.1f}"),
+    ("HS %", "headshot_pct", "{:.1f}"),
+    ("KAST", "kast", "{:.1f}"),
+]
+
+
+def _rounds(stats):
+    """Rounds played so far, from the cumulative kills and kills per round."""
+    if not stats.kills or not stats.kills_per_round:
+        return None
+    return stats.kills / stats.kills_per_round
+
+
+def _matches(stats):
+    """Matches played so far, from the cumulative wins and win rate."""
+    if stats.wins is None or not stats.win_pct:
+        return None
+    return stats.wins / (stats.win_pct / 100)
+
+
+def recent_form(old, new, min_rounds=FORM_MIN_ROUNDS):
+    """Stats of only the games played between two snapshots, as {attribute: value}.
+
+    tracker.gg shows season totals and averages, so the recent games are recovered
+    from the difference: e.g. recent ACS = (ACS₁·rounds₁ − ACS₀·rounds₀) / (rounds₁ − rounds₀).
+    Returns {} if too few rounds were played in between to say anything.
+    """
+    rounds_old, rounds_new = _rounds(old), _rounds(new)
+    if rounds_old is None or rounds_new is None or rounds_new - rounds_old < min_rounds:
+        return {}
+    played = rounds_new - rounds_old
+
+    form = {}
+    for attr in ("acs", "damage_per_round", "kast"):
+        before, after = getattr(old, attr), getattr(new, attr)
+        if before is not None and after is not None:
+            form[attr] = (after * rounds_new - before * rounds_old) / played
+
+    if None not in (old.kills, new.kills, old.deaths, new.deaths) and new.deaths > old.deaths:
+        form["kd_ratio"] = (new.kills - old.kills) / (new.deaths - old.deaths)
+
+    matches_old, matches_new = _matches(old), _matches(new)
+    if matches_old is not None and matches_new is not None and matches_new - matches_old >= 1:
+        form["win_pct"] = 100 * (new.wins - old.wins) / (matches_new - matches_old)
+
+    # Rounding noise on tiny samples can push values out of range
+    for attr in ("kast", "win_pct"):
+        if attr in form:
+            form[attr] = min(100.0, max(0.0, form[attr]))
+    return {attr: max(0.0, value) for attr, value in form.items()}
+
+
+def sparkline(values, width=SPARK_WIDTH):
+    """▁▃▅█ style trend of the known values, downsampled to at most `width` characters."""
+    values = [v for v in values if v is not None]
+    if not values:
+        return ""
+    if len(values) > width:
+        step = (len(values) - 1) / (width - 1)
+        values = [values[round(i * step)] for i in range(width)]
+    low, high = min(values), max(values)
+    if high == low:
+        return SPARK_CHARS[len(SPARK_CHARS) // 2] * len(values)
+    scale = (len(SPARK_CHARS) - 1) / (high - low)
+    return "".join(SPARK_CHARS[round((v - low) * scale)] for v in values)
+
+
+def _format(attr, fmt, value):
+    if value is None:
+        return "N/A"
+    return rank_label(value) if attr == "rank_ordinal" else fmt.format(value)
+
+
+def format_history(username, snapshots, days=None):
+    """Renders [(taken_at, PlayerStats)] (oldest first) as the v/history table."""
+    first_at, first = snapshots[0]
+    last_at, last = snapshots[-1]
+    day = lambda ts: time.strftime("%Y-%m-%d", time.localtime(ts))
+    period = f"last {days:g} days" if days else "all time"
+
+    lines = [
+        f"{username}: {len(snapshots)} snapshot(s), {day(first_at)} -> {day(last_at)} ({period})",
+        "",
+        f"{'Stat':<9}{'First':>12}{'Latest':>12}{'Change':>9}  Trend",
+    ]
+    for label, attr, fmt in TREND_STATS:
+        before, after = getattr(first, attr), getattr(last, attr)
+        if before is None and after is None:
+            continue
+        if before is None or after is None:
+            change = ""
+        elif attr == "rank_ordinal":
+            change = f"{after - before:+d}"
+        else:
+            change = (fmt.replace(":", ":+")).format(after - before)
+        trend = sparkline([getattr(stats, attr) for _, stats in snapshots])
+        lines.append(f"{label:<9}{_format(attr, fmt, before):>12}{_format(attr, fmt, after):>12}{change:>9}  {trend}")
+
+    form = recent_form(first, last)
+    if form:
+        rounds = _rounds(last) - _rounds(first)
+        parts = [f"{label} {_format(attr, fmt, form[attr])}" for label, attr, fmt in TREND_STATS if attr in form]
+        lines += ["", f"Recent form ({rounds:.0f} rounds in this period): " + ", ".join(parts)]
+    return "\n".join(lines)
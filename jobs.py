@@ -0,0 +1,74 @@
+import asyncio
+from collections import defaultdict
+
+
+class InFlight:
+    """Runs at most one coroutine per key at a time; concurrent callers share its result."""
+
+    def __init__(self):
+        self._tasks = {}
+
+    def __len__(self):
+        return len(self._tasks)
+
+    async def run(self, key, factory):
+        """Awaits factory() for this key, or joins the call already in progress."""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        # shield: one waiter being cancelled must not cancel the lookup for the others
+        return await asyncio.shield(task)
+
+
+class GuildJobQueue:
+    """One worker per guild that merges every request queued while it's busy into a single batch.
+
+    process_batch(guild, items) is a coroutine returning a result shared by all the
+    requests in that batch. Batches of the same guild never run at the same time, so
+    their writes can't overwrite each other. The batch takes lock(guild_id) itself,
+    only around its writes, so v/r and v/clear don't wait for a whole scrape.
+    """
+
+    def __init__(self, process_batch):
+        self.process_batch = process_batch
+        self._pending = defaultdict(list)     # guild id -> [(items, future)]
+        self._workers = {}                    # guild id -> task
+        self._locks = defaultdict(asyncio.Lock)
+
+    @property
+    def depth(self):
+        """Requests waiting across all guilds (not counting the batches running now)."""
+        return sum(len(pending) for pending in self._pending.values())
+
+    def lock(self, guild_id):
+        """Per-guild write lock, shared by the batches' writes and commands that write outside the queue (v/r, v/clear)."""
+        return self._locks[guild_id]
+
+    async def submit(self, guild, items):
+        future = asyncio.get_running_loop().create_future()
+        self._pending[guild.id].append((list(items), future))
+
+        worker = self._workers.get(guild.id)
+        if worker is None or worker.done():
+            self._workers[guild.id] = asyncio.create_task(self._run(guild))
+        return await future
+
+    async def _run(self, guild):
+        try:
+            while self._pending.get(guild.id):
+                batch = self._pending.pop(guild.id)
+                items = [item for request, _ in batch for item in request]
+                try:
+                    result = await self.process_batch(guild, items)
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_result(result)
+        finally:
+            self._workers.pop(guild.id, None)
@@ -0,0 +1,176 @@
+import asyncio
+import math
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from aiohttp import web
+
+
+# ✅ Metrics settings (override through the .env file)
+METRICS_FILE = os.getenv("METRICS_FILE", os.path.join("server_data", "metrics.prom"))  # Empty = no file
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 = no HTTP endpoint
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "60"))  # seconds between file writes
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "1000"))  # Samples kept per timing for percentiles
+
+PREFIX = "valotrack_"
+
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of a list of numbers (q between 0 and 1)."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class Metrics:
+    """In-process counters, timing spans and gauges, rendered in the Prometheus text format."""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.window = window
+        self.counters = defaultdict(float)        # (name, labels) -> value
+        self.timings = {}                         # (name, labels) -> [count, total seconds, recent samples]
+        self.gauges = {}                          # name -> callable returning a number
+        self.started = time.time()
+
+    def inc(self, name, value=1, **labels):
+        self.counters[(name, _labels_key(labels))] += value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _labels_key(labels))
+        timing = self.timings.get(key)
+        if timing is None:
+            timing = self.timings[key] = [0, 0.0, deque(maxlen=self.window)]
+        timing[0] += 1
+        timing[1] += seconds
+        timing[2].append(seconds)
+
+    def gauge(self, name, fn):
+        """Registers a callback read every time metrics are rendered (queue depth, cache size...)."""
+        self.gauges[name] = fn
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Times the block. Failures are counted in <name>_errors_total and still timed."""
+        start = time.perf_counter()
+        try:
+            yield
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.inc(f"{name}_errors_total", error=type(e).__name__, **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    # ---------- Reading ----------
+
+    def counter(self, name, **labels):
+        """Sum of a counter over every label set matching the given labels."""
+        wanted = set(_labels_key(labels))
+        return sum(v for (n, key), v in self.counters.items() if n == name and wanted <= set(key))
+
+    def hit_rate(self, hits, misses):
+        total = self.counter(hits) + self.counter(misses)
+        return self.counter(hits) / total if total else None
+
+    def timing_summary(self):
+        """[(name, labels, count, errors, p50, p95)] sorted by name, latencies in seconds."""
+        rows = []
+        for (name, key), (count, _, samples) in sorted(self.timings.items()):
+            errors = self.counter(f"{name}_errors_total", **dict(key))
+            rows.append((name, dict(key), count, errors, percentile(samples, 0.5), percentile(samples, 0.95)))
+        return rows
+
+    def read_gauges(self):
+        values = {}
+        for name, fn in self.gauges.items():
+            try:
+                values[name] = float(fn())
+            except Exception:
+                continue
+        return values
+
+    def render_prometheus(self):
+        lines = []
+        seen = set()
+
+        for (name, key), value in sorted(self.counters.items()):
+            if name not in seen:
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                seen.add(name)
+            lines.append(f"{PREFIX}{name}{_format_labels(key)} {value:g}")
+
+        for (name, key), (count, total, samples) in sorted(self.timings.items()):
+            metric = f"{PREFIX}{name}_seconds"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} summary")
+                seen.add(metric)
+            for q in (0.5, 0.95, 0.99):
+                lines.append(f"{metric}{_format_labels(key, [('quantile', str(q))])} {percentile(samples, q):.6f}")
+            lines.append(f"{metric}_count{_format_labels(key)} {count}")
+            lines.append(f"{metric}_sum{_format_labels(key)} {total:.6f}")
+
+        for name, value in sorted(self.read_gauges().items()):
+            lines.append(f"# TYPE {PREFIX}{name} gauge")
+            lines.append(f"{PREFIX}{name} {value:g}")
+
+        lines.append(f"# TYPE {PREFIX}uptime_seconds gauge")
+        lines.append(f"{PREFIX}uptime_seconds {time.time() - self.started:.0f}")
+        return "\n".join(lines) + "\n"
+
+    # ---------- Exporting ----------
+
+    def _write_file(self, path):
+        text = self.render_prometheus()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)  # Atomic, so a scraper never reads half a file
+
+    async def write_file_forever(self, path=METRICS_FILE, interval=METRICS_INTERVAL):
+        while True:
+            try:
+                await asyncio.to_thread(self._write_file, path)
+            except Exception as e:
+                print(f"⚠ Error writing metrics file: {e}")
+            await asyncio.sleep(interval)
+
+    async def serve(self, port=METRICS_PORT):
+        """Serves GET /metrics on localhost:port for Prometheus."""
+        async def handle(request):
+            return web.Response(text=self.render_prometheus(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        print(f"📈 Metrics available at http://127.0.0.1:{port}/metrics")
+        return runner
+
+    def start(self):
+        """Starts the configured exporters. Returns the background tasks."""
+        tasks = []
+        if METRICS_FILE:
+            tasks.append(asyncio.create_task(self.write_file_forever()))
+        if METRICS_PORT:
+            tasks.append(asyncio.create_task(self.serve()))
+        return tasks
+
+
+# ✅ Shared registry, imported by every module that records metrics
+metrics = Metrics()
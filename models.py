@@ -0,0 +1,194 @@
+from array import array
+from dataclasses import dataclass, fields, replace
+from typing import Optional
+
+
+# ✅ tracker.gg stat label -> PlayerStats attribute (in the order the stats are displayed)
+STAT_FIELDS = {
+    "Damage/Round": "damage_per_round",
+    "K/D Ratio": "kd_ratio",
+    "Headshot %": "headshot_pct",
+    "Win %": "win_pct",
+    "Wins": "wins",
+    "KAST": "kast",
+    "DDΔ/Round": "dd_delta_per_round",
+    "Kills": "kills",
+    "Deaths": "deaths",
+    "Assists": "assists",
+    "ACS": "acs",
+    "KAD Ratio": "kad_ratio",
+    "Kills/Round": "kills_per_round",
+    "First Bloods": "first_bloods",
+    "Flawless Rounds": "flawless_rounds",
+    "Aces": "aces",
+}
+PERCENT_STATS = {"Headshot %", "Win %", "KAST"}
+PRIVATE_RANK = "Private Profile"
+
+RANK_TIERS = ["Iron", "Bronze", "Silver", "Gold", "Platinum", "Diamond", "Ascendant", "Immortal"]
+RADIANT = len(RANK_TIERS) * 3 + 1
+
+NAN = float("nan")
+
+
+def parse_stat(value):
+    """Turns a scraped stat string ('1.08', '52.7%', '1,204') into a float. Returns None for 'N/A'."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return None if value != value else float(value)  # NaN check
+    text = str(value).strip().replace(",", "").rstrip("%").strip()
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def format_stat(label, value):
+    """Inverse of parse_stat, for display: 52.7 -> '52.7%', 1204.0 -> '1,204', None -> 'N/A'."""
+    if value is None:
+        return "N/A"
+    if label in PERCENT_STATS:
+        return f"{value:g}%"
+    if value.is_integer():
+        return f"{int(value):,}"
+    return f"{value:g}"
+
+
+def _rank_table():
+    table = {"radiant": RADIANT}
+    for index, tier in enumerate(RANK_TIERS):
+        table[tier.lower()] = index * 3 + 1
+        for division in (1, 2, 3):
+            table[f"{tier.lower()} {division}"] = index * 3 + division
+    return table
+
+
+# ✅ Precomputed 'iron 1' -> 1 ... 'radiant' -> 25, so the usual rank strings are a single dict lookup
+RANK_ORDINALS = _rank_table()
+
+
+def rank_ordinal(rank):
+    """'Iron 1' -> 1 ... 'Ascendant 1' -> 19 ... 'Radiant' -> 25. Returns None for unknown/private ranks."""
+    if not rank:
+        return None
+    ordinal = RANK_ORDINALS.get(str(rank).strip().lower())
+    if ordinal is not None:
+        return ordinal
+    parts = str(rank).split()
+    if not parts:
+        return None
+    tier = parts[0].capitalize()
+    if tier == "Radiant":
+        return RADIANT
+    if tier not in RANK_TIERS:
+        return None
+    division = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+    return RANK_TIERS.index(tier) * 3 + min(max(division, 1), 3)
+
+
+def rank_label(ordinal):
+    """Inverse of rank_ordinal, rounding averages to the nearest division."""
+    ordinal = round(ordinal)
+    if ordinal >= RADIANT:
+        return "Radiant"
+    tier, division = divmod(max(ordinal, 1) - 1, 3)
+    return f"{RANK_TIERS[tier]} {division + 1}"
+
+
+@dataclass(slots=True)
+class PlayerStats:
+    """One player's stats, parsed once when scraped. Missing stats are None."""
+
+    username: str
+    rank: str = "N/A"
+    rank_ordinal: Optional[int] = None
+    private: bool = False
+    damage_per_round: Optional[float] = None
+    kd_ratio: Optional[float] = None
+    headshot_pct: Optional[float] = None
+    win_pct: Optional[float] = None
+    wins: Optional[float] = None
+    kast: Optional[float] = None
+    dd_delta_per_round: Optional[float] = None
+    kills: Optional[float] = None
+    deaths: Optional[float] = None
+    assists: Optional[float] = None
+    acs: Optional[float] = None
+    kad_ratio: Optional[float] = None
+    kills_per_round: Optional[float] = None
+    first_bloods: Optional[float] = None
+    flawless_rounds: Optional[float] = None
+    aces: Optional[float] = None
+
+    def __post_init__(self):
+        if self.rank_ordinal is None:
+            self.rank_ordinal = rank_ordinal(self.rank)
+
+    @classmethod
+    def private_profile(cls, username):
+        return cls(username=username, rank=PRIVATE_RANK, private=True)
+
+    @classmethod
+    def from_dict(cls, raw):
+        """Builds a PlayerStats from a scraped/stored dict ({'Username': ..., 'Rank': ..., 'K/D Ratio': '1.08', ...})."""
+        rank = str(raw.get("Rank") or "N/A").strip()
+        stats = cls(
+            username=str(raw["Username"]).strip(),
+            rank=rank,
+            rank_ordinal=rank_ordinal(rank),
+            private=rank == PRIVATE_RANK,
+        )
+        for label, attr in STAT_FIELDS.items():
+            setattr(stats, attr, parse_stat(raw.get(label)))
+        return stats
+
+    def to_dict(self):
+        """Numeric dict with the tracker.gg labels, as stored in the database and exports."""
+        data = {"Username": self.username, "Rank": self.rank}
+        for label, attr in STAT_FIELDS.items():
+            data[label] = getattr(self, attr)
+        return data
+
+    def display_items(self):
+        """(label, formatted value) pairs for Discord messages."""
+        yield "Rank", self.rank
+        for label, attr in STAT_FIELDS.items():
+            yield label, format_stat(label, getattr(self, attr))
+
+    def display(self, label):
+        if label == "Rank":
+            return self.rank
+        return format_stat(label, getattr(self, STAT_FIELDS[label]))
+
+    def copy(self, **changes):
+        return replace(self, **changes)
+
+
+NUMERIC_FIELDS = [f.name for f in fields(PlayerStats) if f.name not in ("username", "rank", "private")]
+
+
+class Roster:
+    """Column-oriented view of a list of PlayerStats: one array('d') per numeric stat, NaN = missing."""
+
+    __slots__ = ("players", "usernames", "private", "_columns")
+
+    def __init__(self, players):
+        self.players = list(players)
+        self.usernames = [p.username for p in self.players]
+        self.private = [p.private for p in self.players]
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.players)
+
+    def column(self, attr):
+        """Values of one stat for every player, built on first use."""
+        values = self._columns.get(attr)
+        if values is None:
+            values = array("d", (NAN if v is None else v for v in (getattr(p, attr) for p in self.players)))
+            self._columns[attr] = values
+        return values
+
+    def subset(self, indices):
+        return Roster(self.players[i] for i in indices)
@@ -0,0 +1,198 @@
+import asyncio
+import heapq
+import time
+from bisect import bisect_left, bisect_right, insort
+from jobs import InFlight
+from models import NUMERIC_FIELDS, STAT_FIELDS
+from storage import player_key
+
+
+# ✅ Stats kept sorted by the index: rank ordinal + every numeric stat
+INDEXED_STATS = NUMERIC_FIELDS
+
+# Short names accepted by v/sl, on top of the tracker.gg labels ('K/D Ratio', 'ACS'...)
+SORT_ALIASES = {
+    "rank": "rank_ordinal",
+    "kd": "kd_ratio",
+    "k/d": "kd_ratio",
+    "kad": "kad_ratio",
+    "acs": "acs",
+    "adr": "damage_per_round",
+    "dmg": "damage_per_round",
+    "hs": "headshot_pct",
+    "hs%": "headshot_pct",
+    "win": "win_pct",
+    "win%": "win_pct",
+    "kast": "kast",
+    "fb": "first_bloods",
+    "kpr": "kills_per_round",
+    "ddr": "dd_delta_per_round",
+}
+SORT_ALIASES.update({label.lower(): attr for label, attr in STAT_FIELDS.items()})
+
+# PlayerStats attribute -> label shown by v/sl
+STAT_LABELS = {attr: label for label, attr in STAT_FIELDS.items()}
+STAT_LABELS["rank_ordinal"] = "Rank"
+
+
+def _stat_values(stats):
+    return tuple(getattr(stats, attr) for attr in INDEXED_STATS)
+
+
+def sort_stat(name):
+    """'acs', 'K/D', 'Damage/Round'... -> PlayerStats attribute, or None if it isn't a stat."""
+    return SORT_ALIASES.get(name.strip().lower())
+
+
+def rank_players(players, attr, limit=None):
+    """[(PlayerStats, value)] sorted by one stat, best first. Players without that stat are left out.
+
+    Ties keep the roster order. With a limit, only the top `limit` players are selected (heap, no full sort).
+    """
+    ranked = [(p, getattr(p, attr)) for p in players if getattr(p, attr) is not None]
+    if limit is None or limit >= len(ranked):
+        return sorted(ranked, key=lambda item: -item[1])
+    return heapq.nlargest(limit, ranked, key=lambda item: item[1])
+
+
+class PercentileIndex:
+    """Percentiles of every stat over all stored players, each player counted once.
+
+    Each stat is a sorted list of values, so a percentile is two bisects and a
+    saved or removed player is one insert/delete per stat instead of a rebuild.
+    Only the sorted columns and {username key: values} are kept in memory, using
+    each player's most recently saved stats (whichever server saved them).
+    The table is read from the PlayerStore once (load), after that writes made
+    through the RosterIndex and background refreshes keep it up to date. With a
+    ttl, load() also re-reads it once it's older than ttl seconds, to pick up
+    writes made by other bot processes sharing the database.
+    """
+
+    def __init__(self, store, ttl=0):
+        self.store = store
+        self.ttl = ttl                           # 0 = never re-read after the first load
+        self._values = {}                        # username key -> (value per INDEXED_STATS)
+        self._columns = {attr: [] for attr in INDEXED_STATS}
+        self._loaded_at = None                   # time.monotonic() of the last load
+        self._pending = None                     # Writes made while the table is loading, replayed after
+        self._loading = InFlight()
+
+    def __len__(self):
+        return len(self._values)
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    async def load(self):
+        """Reads every stored player once (and again after ttl). Otherwise returns immediately."""
+        if not self.loaded or (self.ttl > 0 and time.monotonic() - self._loaded_at > self.ttl):
+            await self._loading.run("all", self._load)
+
+    async def _load(self):
+        self._pending = []
+        try:
+            latest = await self.store.latest_stats()
+            built = await asyncio.to_thread(self._build, latest)
+        finally:
+            pending, self._pending = self._pending, None
+        # Until now, queries kept using the previous table
+        self._values, self._columns = built
+        self._loaded_at = time.monotonic()
+        for op in pending:
+            op()
+
+    @staticmethod
+    def _build(latest):
+        values = {key: _stat_values(stats) for key, stats in latest.items()}
+        # Sorting once is much cheaper than len(values) inserts
+        columns = {
+            attr: sorted(v[i] for v in values.values() if v[i] is not None)
+            for i, attr in enumerate(INDEXED_STATS)
+        }
+        return values, columns
+
+    # ---------- Incremental updates (called after the store was written) ----------
+
+    def _apply(self, op):
+        if self.loaded:
+            op()
+        if self._pending is not None:
+            self._pending.append(op)
+        # Never loaded: the store already has the change, load() will read it
+
+    def _set(self, key, stats):
+        self._drop(key)
+        values = self._values[key] = _stat_values(stats)
+        for value, column in zip(values, self._columns.values()):
+            if value is not None:
+                insort(column, value)
+
+    def _drop(self, key):
+        old = self._values.pop(key, None)
+        if old is None:
+            return
+        for value, column in zip(old, self._columns.values()):
+            if value is not None:
+                del column[bisect_left(column, value)]
+
+    def upsert(self, players):
+        """Players just saved by a server: their stats are now the latest."""
+        players = list(players)
+        self._apply(lambda: [self._set(player_key(p.username), p) for p in players])
+
+    async def resync(self, usernames):
+        """Re-reads the latest stored stats of these players, after writes that didn't go through upsert.
+
+        Used when players are removed from a server (those another server still has keep their
+        latest stats) and after a legacy import wrote them straight to the database.
+        """
+        if not self.loaded and self._pending is None:
+            return
+        keys = [player_key(u) for u in usernames]
+        if not keys:
+            return
+        still_stored = await self.store.latest_stats(keys)
+
+        def resync():
+            for key in keys:
+                if key in still_stored:
+                    self._set(key, still_stored[key])
+                else:
+                    self._drop(key)
+        self._apply(resync)
+
+    def refresh(self, stats):
+        """Fresh stats written to every server that has the player (see PlayerStore.refresh_player)."""
+        def refresh():
+            key = player_key(stats.username)
+            if key in self._values:
+                self._set(key, stats)
+        self._apply(refresh)
+
+    # ---------- Queries ----------
+
+    def percentile(self, attr, value):
+        """Share of stored players below this value (ties count half), from 0 to 1. None if unknown."""
+        values = self._columns[attr]
+        if value is None or not values:
+            return None
+        return (bisect_left(values, value) + bisect_right(values, value)) / (2 * len(values))
+
+    def scores(self, stats, attrs=INDEXED_STATS):
+        """{attr: percentile} of one player, None for the stats they're missing."""
+        return {attr: self.percentile(attr, getattr(stats, attr)) for attr in attrs}
+
+    def normalize_columns(self, columns):
+        """Replaces raw stat columns ({attr: [value per player]}) with percentiles.
+
+        Used by the balancer so every stat weighs by the player's standing rather than its raw
+        scale (a 1.4 K/D and a 280 ACS become comparable). Stats with no stored data are kept as-is.
+        """
+        normalized = {}
+        for attr, values in columns.items():
+            if attr in self._columns and self._columns[attr]:
+                normalized[attr] = [self.percentile(attr, v) for v in values]
+            else:
+                normalized[attr] = values
+        return normalized
@@ -0,0 +1,308 @@
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from metrics import metrics
+
+
+# ✅ Scrape protection settings (override through the .env file)
+SCRAPE_RATE = float(os.getenv("SCRAPE_RATE", "30"))  # Profile lookups per minute across every server, 0 = no limit
+SCRAPE_BURST = int(os.getenv("SCRAPE_BURST", "5"))  # Lookups allowed back to back before the rate applies
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "2"))  # seconds, doubled on every retry
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "60"))
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "5"))  # Challenges within BREAKER_WINDOW...
+BREAKER_WINDOW = float(os.getenv("BREAKER_WINDOW", "120"))  # ...seconds pause scraping
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "300"))  # seconds, doubled if the first lookup after fails
+BREAKER_MAX_COOLDOWN = float(os.getenv("BREAKER_MAX_COOLDOWN", "3600"))
+
+
+class ScrapeError(Exception):
+    """A profile lookup failed. reason is shown to the user, kind decides retries and the circuit breaker."""
+
+    CHALLENGE = "challenge"    # Cloudflare check page
+    NOT_FOUND = "not_found"    # Page loaded, but no stats (wrong Riot ID, never played ranked...)
+    TIMEOUT = "timeout"
+    PAUSED = "paused"          # Circuit breaker open, nothing was sent
+    ERROR = "error"
+
+    RETRYABLE = {CHALLENGE, TIMEOUT, ERROR}
+
+    def __init__(self, reason, kind=ERROR):
+        super().__init__(reason)
+        self.reason = reason
+        self.kind = kind
+
+    @property
+    def retryable(self):
+        return self.kind in self.RETRYABLE
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY, rng=random):
+    """Exponential backoff with jitter: half the delay is fixed, the other half random."""
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+
+class TokenBucket:
+    """Rate limit for this process: `rate` tokens per minute, up to `burst` saved up while idle.
+
+    With several bot processes, use SharedTokenBucket so the limit holds for all of them.
+    """
+
+    def __init__(self, rate=SCRAPE_RATE, burst=SCRAPE_BURST, clock=time.monotonic):
+        self.rate = rate / 60
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self._clock = clock
+        self._updated = clock()
+        self._lock = asyncio.Lock()  # Waiters are served in order
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class CircuitBreaker:
+    """Stops every lookup for a while when challenge pages spike.
+
+    Opens after `threshold` challenges within `window` seconds. Once the cooldown is
+    over, lookups resume; if the next one is challenged again it reopens right away
+    with twice the cooldown, and a successful lookup resets it.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, window=BREAKER_WINDOW, cooldown=BREAKER_COOLDOWN,
+                 max_cooldown=BREAKER_MAX_COOLDOWN, clock=time.monotonic):
+        self.threshold = max(1, threshold)
+        self.window = window
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._clock = clock
+        self._challenges = deque()
+        self.trips = 0  # Trips since the last successful lookup
+        self.open_until = 0.0
+
+    @property
+    def is_open(self):
+        return self._clock() < self.open_until
+
+    @property
+    def remaining(self):
+        """Seconds until lookups resume (0 if closed)."""
+        return max(0.0, self.open_until - self._clock())
+
+    def allow(self):
+        return not self.is_open
+
+    def record_success(self):
+        self._challenges.clear()
+        self.trips = 0
+
+    async def sync(self):
+        """Nothing to do for a breaker local to this process, see SharedCircuitBreaker."""
+
+    def record_challenge(self, now=None):
+        now = self._clock() if now is None else now
+        self._challenges.append(now)
+        while self._challenges and now - self._challenges[0] > self.window:
+            self._challenges.popleft()
+        # Right after a trip, a single challenge is enough to reopen
+        if len(self._challenges) >= (1 if self.trips else self.threshold):
+            self._trip(now)
+
+    def _trip(self, now):
+        cooldown = min(self.max_cooldown, self.cooldown * 2 ** self.trips)
+        self.trips += 1
+        self.open_until = now + cooldown
+        self._challenges.clear()
+        metrics.inc("breaker_trips_total")
+        print(f"⛔ **Too many Cloudflare challenges, scraping paused for {cooldown:.0f}s**")
+
+
+# ---------- State shared by every bot process (sharding.py --processes N) ----------
+
+SHARED_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrape_bucket (
+    name    TEXT PRIMARY KEY,
+    tokens  REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scrape_breaker (
+    name       TEXT PRIMARY KEY,
+    open_until REAL    NOT NULL,
+    trips      INTEGER NOT NULL,
+    challenges TEXT    NOT NULL
+);
+"""
+
+
+class SharedScrapeState:
+    """Rate limit and circuit breaker state in the SQLite database every shard process uses.
+
+    Each read-modify-write runs in one IMMEDIATE transaction, so processes never
+    hand out the same token or lose each other's challenges. Methods are blocking,
+    call them through asyncio.to_thread.
+    """
+
+    def __init__(self, path, name="tracker.gg"):
+        self.path = path
+        self.name = name
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _transaction(self, fn):
+        with self._lock:
+            if self._conn is None:
+                if os.path.dirname(self.path):
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SHARED_STATE_SCHEMA)
+                self._conn = conn
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def take_token(self, rate, capacity):
+        """Takes one token if there is one. Returns (seconds to wait before trying again, tokens left)."""
+        def take(conn):
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated FROM scrape_bucket WHERE name = ?", (self.name,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute("INSERT OR REPLACE INTO scrape_bucket VALUES (?, ?, ?)", (self.name, tokens, now))
+            return wait, tokens
+        return self._transaction(take)
+
+    def update_breaker(self, update):
+        """Runs update((open_until, trips, challenges)) -> new state on the stored breaker state."""
+        def apply(conn):
+            row = conn.execute(
+                "SELECT open_until, trips, challenges FROM scrape_breaker WHERE name = ?", (self.name,)
+            ).fetchone()
+            state = (row[0], row[1], json.loads(row[2])) if row else (0.0, 0, [])
+            open_until, trips, challenges = update(state)
+            conn.execute(
+                "INSERT OR REPLACE INTO scrape_breaker VALUES (?, ?, ?, ?)",
+                (self.name, open_until, trips, json.dumps(challenges)),
+            )
+        self._transaction(apply)
+
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket whose tokens live in a SharedScrapeState: SCRAPE_RATE holds for all processes together."""
+
+    def __init__(self, state, rate=SCRAPE_RATE, burst=SCRAPE_BURST):
+        super().__init__(rate, burst, clock=time.time)
+        self.state = state
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                wait, self.tokens = await asyncio.to_thread(self.state.take_token, self.rate, self.capacity)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+
+
+class SharedCircuitBreaker(CircuitBreaker):
+    """CircuitBreaker whose state lives in a SharedScrapeState: challenges seen by any process count,
+    and a trip pauses scraping everywhere.
+
+    Successes and challenges are queued locally and replayed on the stored state by sync(),
+    which also reads the current state back (allow/is_open/remaining use the last sync).
+    """
+
+    def __init__(self, state, **kwargs):
+        super().__init__(clock=time.time, **kwargs)
+        self.state = state
+        self._events = []  # None = success, timestamp = challenge
+
+    def record_success(self):
+        self._events.append(None)
+
+    def record_challenge(self, now=None):
+        self._events.append(self._clock() if now is None else now)
+
+    async def sync(self):
+        events, self._events = self._events, []
+        await asyncio.to_thread(self.state.update_breaker, lambda state: self._replay(state, events))
+
+    def _replay(self, state, events):
+        self.open_until, self.trips, challenges = state
+        self._challenges = deque(challenges)
+        for event in events:
+            if event is None:
+                CircuitBreaker.record_success(self)
+            else:
+                CircuitBreaker.record_challenge(self, event)
+        return self.open_until, self.trips, list(self._challenges)
+
+
+class ResilientFetcher:
+    """Wraps a fetch(player) coroutine with the global rate limit, retries and the circuit breaker."""
+
+    def __init__(self, fetch, bucket=None, breaker=None, attempts=RETRY_ATTEMPTS):
+        self._fetch = fetch
+        self.bucket = bucket or TokenBucket()
+        self.breaker = breaker or CircuitBreaker()
+        self.attempts = max(1, attempts)
+
+    async def fetch(self, player):
+        """Returns PlayerStats. Raises ScrapeError once retries are exhausted or while scraping is paused."""
+        for attempt in range(self.attempts):
+            await self.breaker.sync()
+            if not self.breaker.allow():
+                raise ScrapeError(
+                    f"scraping paused for {self.breaker.remaining:.0f}s, tracker.gg is blocking us",
+                    ScrapeError.PAUSED,
+                )
+            await self.bucket.acquire()
+
+            try:
+                stats = await self._fetch(player)
+            except ScrapeError as e:
+                error = e
+            except Exception as e:
+                error = ScrapeError(f"unexpected error: {e}")
+            else:
+                self.breaker.record_success()
+                await self.breaker.sync()
+                return stats
+
+            if error.kind == ScrapeError.CHALLENGE:
+                self.breaker.record_challenge()
+                await self.breaker.sync()
+            if not error.retryable or attempt == self.attempts - 1:
+                raise error
+
+            delay = backoff_delay(attempt)
+            metrics.inc("scrape_retries_total", kind=error.kind)
+            print(f"🔁 **Retrying {player} in {delay:.1f}s** ({error.reason})")
+            await asyncio.sleep(delay)
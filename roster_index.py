@@ -0,0 +1,149 @@
+import os
+import time
+from collections import OrderedDict
+from jobs import InFlight
+from storage import player_key
+
+
+# ✅ Roster index settings (override through the .env file)
+ROSTER_INDEX_GUILDS = int(os.getenv("ROSTER_INDEX_GUILDS", "500"))  # Servers kept in memory at once
+ROSTER_INDEX_TTL = float(os.getenv("ROSTER_INDEX_TTL", "300"))  # Seconds, when several processes share the database
+
+
+class RosterIndex:
+    """Resident per-server rosters: {username key: PlayerStats}, in the order players were added.
+
+    A server's roster is loaded from the PlayerStore the first time it's needed, then
+    membership checks and lookups never touch the disk. Writes go to the store first,
+    and only the players that changed are written. The least recently used servers
+    are dropped past max_guilds and simply reloaded on their next command.
+    With a ttl, rosters older than ttl seconds are reloaded on their next use, so
+    refreshes written by another bot process sharing the database show up.
+    Every write is also passed on to the percentile index, if one is given.
+    """
+
+    def __init__(self, store, max_guilds=ROSTER_INDEX_GUILDS, percentiles=None, ttl=0):
+        self.store = store
+        self.percentiles = percentiles          # PercentileIndex kept in sync with the store
+        self.max_guilds = max(1, max_guilds)
+        self.ttl = ttl                          # 0 = a resident roster is never reloaded
+        self._rosters = OrderedDict()   # guild id -> {username key: PlayerStats}
+        self._loaded_at = {}            # guild id -> time.monotonic() of the last load
+        self._pending = {}              # guild id -> [fn(roster)] writes made while its roster was loading
+        self._loading = InFlight()
+
+    def __len__(self):
+        return len(self._rosters)
+
+    def _expired(self, guild_id):
+        return self.ttl > 0 and time.monotonic() - self._loaded_at.get(guild_id, 0.0) > self.ttl
+
+    async def roster(self, guild_id):
+        """The server's roster dict. Read-only for callers: change it through upsert/remove/clear.
+
+        A reload (ttl) updates the same dict, so callers holding it see the fresh players.
+        """
+        roster = self._rosters.get(guild_id)
+        if roster is None or self._expired(guild_id):
+            roster = await self._loading.run(guild_id, lambda: self._load(guild_id))
+        if guild_id in self._rosters:
+            self._rosters.move_to_end(guild_id)
+        return roster
+
+    async def _load(self, guild_id):
+        self._pending[guild_id] = []
+        try:
+            players = await self.store.load_players(guild_id)
+        finally:
+            pending = self._pending.pop(guild_id)
+        fresh = {player_key(p.username): p for p in players}
+        # The store may have been read before these writes landed
+        for op in pending:
+            op(fresh)
+
+        roster = self._rosters.get(guild_id)
+        if roster is None:
+            roster = self._rosters[guild_id] = fresh
+        else:
+            roster.clear()
+            roster.update(fresh)
+        self._loaded_at[guild_id] = time.monotonic()
+        while len(self._rosters) > self.max_guilds:
+            evicted, _ = self._rosters.popitem(last=False)
+            self._loaded_at.pop(evicted, None)
+        return roster
+
+    def _apply(self, guild_id, op):
+        """Applies a write to the resident roster, and again after a load in progress."""
+        roster = self._rosters.get(guild_id)
+        if roster is not None:
+            op(roster)
+        pending = self._pending.get(guild_id)
+        if pending is not None:
+            pending.append(op)
+
+    async def players(self, guild_id):
+        """Every player of the server as a new list, in the order they were added."""
+        return list((await self.roster(guild_id)).values())
+
+    async def usernames(self, guild_id):
+        return [p.username for p in (await self.roster(guild_id)).values()]
+
+    async def get(self, guild_id, username):
+        return (await self.roster(guild_id)).get(player_key(username))
+
+    async def contains(self, guild_id, username):
+        return player_key(username) in await self.roster(guild_id)
+
+    # ---------- Writes (store first, then memory) ----------
+
+    async def upsert(self, guild_id, players):
+        """Saves new or updated players of a server."""
+        if not players:
+            return
+        players = list(players)
+        await self.roster(guild_id)
+        await self.store.upsert_players(guild_id, players)
+        self._apply(guild_id, lambda roster: roster.update((player_key(p.username), p) for p in players))
+        if self.percentiles is not None:
+            self.percentiles.upsert(players)
+
+    async def remove(self, guild_id, username):
+        """Deletes one player. Returns False if they weren't in the list (no disk access then)."""
+        roster = await self.roster(guild_id)
+        key = player_key(username)
+        if key not in roster:
+            return False
+        await self.store.remove_player(guild_id, username)
+        self._apply(guild_id, lambda roster: roster.pop(key, None))
+        if self.percentiles is not None:
+            await self.percentiles.resync([username])
+        return True
+
+    async def clear(self, guild_id):
+        """Deletes every player of a server. Returns how many were removed."""
+        usernames = [p.username for p in (await self.roster(guild_id)).values()]
+        removed = await self.store.clear_guild(guild_id)
+        self._apply(guild_id, lambda roster: roster.clear())
+        if self.percentiles is not None:
+            await self.percentiles.resync(usernames)
+        return removed
+
+    def refresh(self, stats):
+        """Updates a player refreshed in the store in every resident roster, keeping each server's spelling."""
+        if self.percentiles is not None:
+            self.percentiles.refresh(stats)
+        key = player_key(stats.username)
+
+        def update(roster):
+            current = roster.get(key)
+            if current is not None:
+                roster[key] = stats.copy(username=current.username)
+
+        for guild_id in set(self._rosters) | set(self._pending):
+            self._apply(guild_id, update)
+
+    def invalidate(self, guild_id):
+        """Forgets a server's roster, e.g. after its data was changed outside the index."""
+        self._rosters.pop(guild_id, None)
+        self._loaded_at.pop(guild_id, None)
@@ -0,0 +1,142 @@
+import asyncio
+import itertools
+import os
+import time
+from datetime import datetime
+from resilience import ScrapeError
+from storage import player_key
+
+
+# ✅ Refresh settings (override through the .env file)
+REFRESH_STALE_AFTER = float(os.getenv("REFRESH_STALE_AFTER", "24")) * 3600  # hours -> seconds
+REFRESH_RATE = float(os.getenv("REFRESH_RATE", "6"))  # Scrapes per minute, all servers together
+REFRESH_OFF_PEAK = os.getenv("REFRESH_OFF_PEAK", "3-9")  # Local hours when stale players are refreshed
+REFRESH_SCAN_INTERVAL = float(os.getenv("REFRESH_SCAN_INTERVAL", "600"))  # seconds
+REFRESH_BATCH = int(os.getenv("REFRESH_BATCH", "100"))
+
+MANUAL, BACKGROUND = 0, 1  # Queue priorities, v/refresh jumps ahead of background work
+
+
+def parse_hours(window):
+    """'3-9' -> {3, 4, ..., 8}. Wraps around midnight ('22-4'). Empty means always off-peak."""
+    if not window.strip():
+        return set(range(24))
+    start, _, end = window.partition("-")
+    start, end = int(start) % 24, int(end or start) % 24
+    if start == end:
+        return set(range(24))
+    return {h % 24 for h in range(start, end if end > start else end + 24)}
+
+
+class RefreshScheduler:
+    """Re-scrapes stale players in the background under a global rate limit.
+
+    Players are queued once no matter how many servers have them, and the fresh
+    stats are written to every server's row in one update.
+    """
+
+    def __init__(self, store, fetch, cache=None, stale_after=REFRESH_STALE_AFTER, rate=REFRESH_RATE,
+                 off_peak=REFRESH_OFF_PEAK, scan_interval=REFRESH_SCAN_INTERVAL, on_refresh=None):
+        self.store = store
+        self.fetch = fetch                  # Coroutine function (player) -> PlayerStats, raises ScrapeError
+        self.cache = cache
+        self.on_refresh = on_refresh        # Called with the fresh stats once the store is updated
+        self.stale_after = stale_after
+        self.interval = 60 / rate if rate > 0 else 0
+        self.off_peak = off_peak
+        self.off_peak_hours = parse_hours(off_peak)
+        self.scan_interval = scan_interval
+        self._queue = asyncio.PriorityQueue()
+        self._queued = {}                   # player key -> priority, to dedupe across servers
+        self._order = itertools.count()     # FIFO within the same priority
+        self._tasks = []
+        self._last_scrape = 0.0
+
+    @property
+    def pending(self):
+        return len(self._queued)
+
+    def is_off_peak(self, now=None):
+        return (now or datetime.now()).hour in self.off_peak_hours
+
+    def start(self, scan=True):
+        """Starts the worker loop, and the stale-player scan unless scan=False.
+
+        The worker serves v/refresh, so it runs in every process. Safe to call again, e.g. on every on_ready.
+        """
+        if any(not task.done() for task in self._tasks):
+            return
+        self._tasks = [asyncio.create_task(self._worker_loop())]
+        if scan:
+            self._tasks.append(asyncio.create_task(self._scan_loop()))
+            print(f"✅ Refresh scheduler started (off-peak hours: {self.off_peak or 'always'})")
+        else:
+            print("✅ Refresh worker started (stale players are scanned by the process holding shard 0)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, player, priority=MANUAL):
+        """Queues a player for refresh. Returns False if they're already queued."""
+        key = player_key(player)
+        queued = self._queued.get(key)
+        if queued is not None and queued <= priority:
+            return False
+        # A manual request for a player already queued in the background just gets a better slot
+        self._queued[key] = priority
+        self._queue.put_nowait((priority, next(self._order), key, player))
+        return True
+
+    async def _scan_loop(self):
+        while True:
+            try:
+                if self.is_off_peak():
+                    stale = await self.store.stale_players(time.time() - self.stale_after, REFRESH_BATCH)
+                    added = sum(self.enqueue(player, BACKGROUND) for player, _ in stale)
+                    if added:
+                        print(f"🔄 Queued {added} stale players for refresh")
+            except Exception as e:
+                print(f"❌ **Error scanning for stale players:** {e}")
+            await asyncio.sleep(self.scan_interval)
+
+    async def _worker_loop(self):
+        while True:
+            priority, _, key, player = await self._queue.get()
+            try:
+                # Skip entries that were re-queued with a better priority
+                if self._queued.get(key) != priority:
+                    continue
+                del self._queued[key]
+
+                # Background work waits for the next off-peak window (the scan will queue it again)
+                if priority == BACKGROUND and not self.is_off_peak():
+                    continue
+
+                wait = self._last_scrape + self.interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._last_scrape = time.monotonic()
+
+                await self.refresh(player)
+            except Exception as e:
+                print(f"❌ **Error refreshing {player}:** {e}")
+            finally:
+                self._queue.task_done()
+
+    async def refresh(self, player):
+        """Scrapes one player now and updates every server that has them."""
+        try:
+            stats = await self.fetch(player)
+        except ScrapeError as e:
+            print(f"⚠ **Refresh failed for {player}** ({e.reason}), will retry on the next scan.")
+            return None
+        updated = await self.store.refresh_player(stats)
+        if self.cache is not None:
+            self.cache.put(player, stats)
+        if self.on_refresh is not None:
+            self.on_refresh(stats)
+        print(f"♻ **Refreshed {player}** ({updated} server(s))")
+        return stats
@@ -0,0 +1,215 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+import threading
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from browser_pool import BrowserPool
+from extractor import READY_SELECTOR, extract_page, payload_to_stats
+from fetcher import PAGE_URL, ProfileFetcher, is_challenge, riot_id_path
+from metrics import metrics
+from models import PlayerStats
+from resilience import ScrapeError
+
+
+# ✅ Worker process settings (override through the .env file)
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", "0"))  # 0 = scrape inside the bot process
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "5"))  # Players scraped at once per worker
+WORKER_TIMEOUT = float(os.getenv("WORKER_TIMEOUT", "180"))  # seconds before a job is given up on
+CHALLENGE_TIMEOUT = float(os.getenv("CHALLENGE_TIMEOUT", "30"))  # seconds to wait for a Cloudflare check to clear
+
+
+async def scrape_profile_browser(pool, player, page_url=PAGE_URL):
+    """Scrapes a single player's tracker.gg profile using a page from the browser pool.
+
+    Raises ScrapeError with the reason when the profile can't be read.
+    """
+    url = page_url.format(riot_id_path(player))
+
+    print(f"\n🔹 **Scraping stats for {player} in the browser...**")
+
+    try:
+        async with pool.page() as page:
+            print(f"🔹 **Opening URL:** {url}")
+            with metrics.span("page_goto"):
+                await page.goto(url, timeout=60000)
+
+            # ✅ Handle Cloudflare CAPTCHA: wait until the check clears (or is solved by hand), not a fixed delay
+            if is_challenge(200, await page.content()):
+                print(f"⚠ **Cloudflare detected!** Solve the CAPTCHA manually within {CHALLENGE_TIMEOUT:.0f}s.")
+                metrics.inc("cloudflare_challenges_total")
+                try:
+                    with metrics.span("cloudflare_wait"):
+                        await page.wait_for_selector(READY_SELECTOR, timeout=CHALLENGE_TIMEOUT * 1000)
+                except PlaywrightTimeoutError:
+                    raise ScrapeError("blocked by a Cloudflare check", ScrapeError.CHALLENGE)
+
+            # ✅ Wait for either the stats or the private profile banner, then read everything in one go
+            with metrics.span("extract"):
+                await page.wait_for_selector(READY_SELECTOR, timeout=20000)
+                payload = await extract_page(page)
+
+            print(f"🔹 **Private Profile Message:** {payload['private_message']}")
+            print(f"🏆 Rank: {payload['rank']}")
+
+            # ✅ Parse the scraped strings into numbers once, here
+            stats = payload_to_stats(player, payload)
+            if stats is None:
+                print(f"❌ **No stats found on {player}'s page.**")
+                raise ScrapeError("no stats on the profile, check the Riot ID", ScrapeError.NOT_FOUND)
+            return stats
+
+    except ScrapeError:
+        raise
+    except PlaywrightTimeoutError:
+        print(f"❌ **Timed out loading {player}'s profile**")
+        raise ScrapeError("the profile page did not load in time", ScrapeError.TIMEOUT)
+    except Exception as e:
+        print(f"❌ **Error scraping {player}:** {e}")
+        raise ScrapeError(f"browser error ({e})")
+
+
+# ---------- Worker process side ----------
+
+def _worker_main(requests, results, concurrency):
+    """Entry point of a worker process: its own event loop, HTTP session and browser."""
+    asyncio.run(_worker_loop(requests, results, concurrency))
+
+
+async def _worker_loop(requests, results, concurrency):
+    pool = BrowserPool()
+    fetcher = ProfileFetcher(browser_fallback=lambda player: scrape_profile_browser(pool, player))
+    slots = asyncio.Semaphore(max(1, concurrency))
+    tasks = set()
+
+    async def handle(job_id, player):
+        try:
+            stats = await fetcher.fetch(player)
+            # PlayerStats travel as plain dicts, rebuilt with from_dict on the bot side
+            results.put((job_id, stats.to_dict(), None))
+        except ScrapeError as e:
+            results.put((job_id, None, (e.reason, e.kind)))
+        except Exception as e:
+            results.put((job_id, None, (f"worker error ({type(e).__name__}: {e})", ScrapeError.ERROR)))
+        finally:
+            slots.release()
+
+    try:
+        while True:
+            await slots.acquire()
+            job = await asyncio.to_thread(requests.get)
+            if job is None:
+                break
+            task = asyncio.create_task(handle(*job))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    finally:
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await fetcher.close()
+        await pool.stop()
+
+
+# ---------- Bot process side ----------
+
+class ScrapeWorkerPool:
+    """Runs the scraping stack (HTTP fetcher + browser) in separate processes.
+
+    Jobs go out on one multiprocessing queue and results come back on another, so
+    Chrome and HTML parsing never compete with the Discord event loop. fetch() has
+    the same signature as ProfileFetcher.fetch().
+    """
+
+    def __init__(self, processes=SCRAPE_WORKERS, concurrency=WORKER_CONCURRENCY, timeout=WORKER_TIMEOUT):
+        self.processes = max(1, processes)
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._mp = multiprocessing.get_context("spawn")  # No forked copy of the bot's sockets and threads (see valotrack.py)
+        self._requests = self._mp.Queue()
+        self._results = self._mp.Queue()
+        self._workers = []
+        self._futures = {}
+        self._ids = itertools.count()
+        self._loop = None
+        self._reader = None
+
+    @property
+    def pending(self):
+        """Jobs sent to the workers and not answered yet."""
+        return len(self._futures)
+
+    def start(self):
+        """Starts the worker processes. Safe to call again, e.g. on every on_ready."""
+        if self._reader is not None:
+            self._replace_dead_workers()
+            return
+        self._loop = asyncio.get_running_loop()
+        for _ in range(self.processes):
+            self._spawn()
+        self._reader = threading.Thread(target=self._read_results, name="scrape-results", daemon=True)
+        self._reader.start()
+        print(f"✅ Started {self.processes} scrape worker process(es), {self.concurrency} players at once each")
+
+    def _spawn(self):
+        worker = self._mp.Process(
+            target=_worker_main,
+            args=(self._requests, self._results, self.concurrency),
+            name=f"scrape-worker-{len(self._workers)}",
+            daemon=True,
+        )
+        worker.start()
+        self._workers.append(worker)
+
+    def _replace_dead_workers(self):
+        alive = [w for w in self._workers if w.is_alive()]
+        dead = len(self._workers) - len(alive)
+        self._workers = alive
+        for _ in range(dead):
+            print("⚠ A scrape worker died, starting a new one")
+            self._spawn()
+
+    def _read_results(self):
+        while True:
+            item = self._results.get()
+            if item is None:
+                return
+            self._loop.call_soon_threadsafe(self._resolve, *item)
+
+    def _resolve(self, job_id, data, error):
+        future = self._futures.pop(job_id, None)
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(ScrapeError(*error))
+        else:
+            future.set_result(PlayerStats.from_dict(data))
+
+    async def fetch(self, player):
+        """Returns PlayerStats. Raises ScrapeError if the worker failed or didn't answer in time."""
+        self.start()
+        job_id = next(self._ids)
+        future = self._loop.create_future()
+        self._futures[job_id] = future
+        self._requests.put((job_id, player))
+        try:
+            with metrics.span("worker_scrape"):
+                return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠ Scrape worker did not answer for {player} within {self.timeout:.0f}s")
+            raise ScrapeError("the scrape worker did not answer in time", ScrapeError.TIMEOUT)
+        finally:
+            self._futures.pop(job_id, None)
+
+    async def close(self):
+        """Asks every worker to finish its current jobs, then stops them."""
+        if self._reader is None:
+            return
+        for _ in self._workers:
+            self._requests.put(None)
+        for worker in self._workers:
+            await asyncio.to_thread(worker.join, 30)
+            if worker.is_alive():
+                worker.terminate()
+        self._results.put(None)
+        await asyncio.to_thread(self._reader.join, 5)
+        self._workers = []
+        self._reader = None
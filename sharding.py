@@ -0,0 +1,99 @@
+"""Sharded deployment.
+
+SHARD_MODE=auto runs discord.py's AutoShardedBot in one process (Discord picks the
+shard count unless SHARD_COUNT is set). To spread the shards over several processes:
+
+    python sharding.py --processes 4 --shard-count 16
+
+starts valotrack.py once per group of shards, with SHARD_IDS/SHARD_COUNT set.
+Those processes share the scrape rate limit and circuit breaker through the
+database (see SharedScrapeState in resilience.py), so SCRAPE_RATE is the total.
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+from discord.ext import commands
+from dotenv import load_dotenv
+
+
+# ✅ Sharding settings (override through the .env file)
+SHARD_MODE = os.getenv("SHARD_MODE", "").strip().lower()  # "" = single Bot, "auto" = AutoShardedBot
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0")) or None  # Total shards across every process
+SHARD_IDS = [int(i) for i in os.getenv("SHARD_IDS", "").split(",") if i.strip()] or None  # Shards of this process
+
+
+def create_bot(**kwargs):
+    """Returns a commands.Bot, or an AutoShardedBot when sharding is configured."""
+    if SHARD_IDS is not None:
+        if SHARD_COUNT is None:
+            raise ValueError("SHARD_IDS needs SHARD_COUNT (the total number of shards)")
+        print(f"🔹 Running shards {SHARD_IDS} of {SHARD_COUNT}")
+        return commands.AutoShardedBot(shard_ids=SHARD_IDS, shard_count=SHARD_COUNT, **kwargs)
+    if SHARD_MODE == "auto":
+        print(f"🔹 Running every shard in this process ({SHARD_COUNT or 'automatic'} shards)")
+        return commands.AutoShardedBot(shard_count=SHARD_COUNT, **kwargs)
+    return commands.Bot(**kwargs)
+
+
+def runs_background_jobs():
+    """Jobs shared by every guild (the stale-player scan) only run in the process holding shard 0."""
+    return SHARD_IDS is None or 0 in SHARD_IDS
+
+
+def shard_groups(processes, shard_count):
+    """Splits shard ids 0..shard_count-1 into `processes` contiguous groups."""
+    processes = max(1, min(processes, shard_count))
+    size, extra = divmod(shard_count, processes)
+    groups, start = [], 0
+    for i in range(processes):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(list(range(start, end)))
+        start = end
+    return groups
+
+
+def launch(processes, shard_count):
+    """Starts one bot process per shard group and waits for all of them."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "valotrack.py")
+    metrics_file = os.getenv("METRICS_FILE", os.path.join("server_data", "metrics.prom"))
+    metrics_port = int(os.getenv("METRICS_PORT", "0"))
+
+    children = []
+    for number, ids in enumerate(shard_groups(processes, shard_count)):
+        env = dict(os.environ, SHARD_IDS=",".join(map(str, ids)), SHARD_COUNT=str(shard_count))
+        # Each process exports its own metrics
+        if metrics_file:
+            root, ext = os.path.splitext(metrics_file)
+            env["METRICS_FILE"] = f"{root}-{number}{ext}"
+        if metrics_port:
+            env["METRICS_PORT"] = str(metrics_port + number)
+        print(f"🚀 Starting shards {ids[0]}-{ids[-1]} of {shard_count}")
+        children.append(subprocess.Popen([sys.executable, script], env=env))
+
+    try:
+        return max(child.wait() for child in children)
+    except KeyboardInterrupt:
+        for child in children:
+            child.send_signal(signal.SIGINT)
+        for child in children:
+            child.wait()
+        return 0
+
+
+def main(argv=None):
+    load_dotenv()
+    shard_count = int(os.getenv("SHARD_COUNT", "0")) or None
+    parser = argparse.ArgumentParser(description="Runs the bot as several shard processes.")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Bot processes to start")
+    parser.add_argument("--shard-count", type=int, default=shard_count, help="Total shards (defaults to SHARD_COUNT)")
+    args = parser.parse_args(argv)
+    if not args.shard_count:
+        parser.error("--shard-count (or SHARD_COUNT) is required")
+    sys.exit(launch(args.processes, args.shard_count))
+
+
+if __name__ == "__main__":
+    main()
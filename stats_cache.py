@@ -0,0 +1,59 @@
+import os
+import time
+from collections import OrderedDict
+
+
+# ✅ Cache settings (override through the .env file)
+STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", str(6 * 60 * 60)))  # seconds
+STATS_CACHE_SIZE = int(os.getenv("STATS_CACHE_SIZE", "5000"))
+
+
+def normalize_riot_id(player):
+    """Normalizes a Riot ID so 'Name #Tag' and 'name#tag' hit the same cache entry."""
+    name, sep, tag = player.strip().partition("#")
+    return f"{' '.join(name.split())}{sep}{tag.strip()}".casefold()
+
+
+class StatsCache:
+    """In-memory player stats cache shared by every guild, with TTL expiry and an LRU size bound."""
+
+    def __init__(self, ttl=STATS_CACHE_TTL, max_size=STATS_CACHE_SIZE, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (stored_at, stats)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, player):
+        return self.get(player) is not None
+
+    def get(self, player):
+        """Returns a copy of the cached PlayerStats for a player, or None if missing/expired."""
+        key = normalize_riot_id(player)
+        entry = self._entries.get(key)
+
+        if entry is not None and self._clock() - entry[0] > self.ttl:
+            del self._entries[key]
+            entry = None
+
+        if entry is None:
+            return None
+
+        self._entries.move_to_end(key)
+        return entry[1].copy()
+
+    def put(self, player, stats):
+        """Stores freshly scraped stats, evicting the least recently used entries when full."""
+        key = normalize_riot_id(player)
+        self._entries[key] = (self._clock(), stats.copy())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, player):
+        self._entries.pop(normalize_riot_id(player), None)
+
+    def clear(self):
+        self._entries.clear()
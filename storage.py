@@ -0,0 +1,433 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import pandas as pd
+from metrics import metrics
+from models import NUMERIC_FIELDS, PlayerStats, rank_label
+
+
+# ✅ Database settings (override through the .env file)
+BASE_DIR = "server_data"
+DB_PATH = os.getenv("DB_PATH", os.path.join(BASE_DIR, "valotrack.db"))
+
+EXPORT_COLUMNS = ["Username", "Rank", "K/D Ratio", "ACS", "Win %", "Damage/Round"]
+LEGACY_NAME = "legacy"  # Old <server name>_stats.json/.csv files are renamed legacy_stats.* when migrated
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    guild_id     INTEGER NOT NULL,
+    username_key TEXT    NOT NULL,
+    username     TEXT    NOT NULL,
+    stats        TEXT    NOT NULL,
+    updated_at   REAL    NOT NULL,
+    PRIMARY KEY (guild_id, username_key)
+);
+CREATE INDEX IF NOT EXISTS idx_players_username ON players (username_key);
+
+CREATE TABLE IF NOT EXISTS ai_cache (
+    guild_id   INTEGER NOT NULL,
+    prompt_key TEXT    NOT NULL,
+    response   TEXT    NOT NULL,
+    created_at REAL    NOT NULL,
+    PRIMARY KEY (guild_id, prompt_key)
+);
+
+CREATE TABLE IF NOT EXISTS legacy_imports (
+    guild_id    INTEGER PRIMARY KEY,
+    source      TEXT NOT NULL,
+    imported_at REAL NOT NULL
+);
+"""
+
+# ✅ Stats history: one narrow row of numbers per scrape, only when something changed.
+#    WITHOUT ROWID keeps each player's snapshots together, sorted by time, in the primary key.
+SNAPSHOT_COLUMNS = NUMERIC_FIELDS  # rank_ordinal + every numeric stat
+SNAPSHOT_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS snapshots (
+    username_key TEXT    NOT NULL,
+    taken_at     INTEGER NOT NULL,
+    {", ".join(f"{column} REAL" for column in SNAPSHOT_COLUMNS)},
+    PRIMARY KEY (username_key, taken_at)
+) WITHOUT ROWID;
+"""
+
+
+def player_key(username):
+    """Lookup key for a username (usernames are matched case-insensitively)."""
+    return username.strip().lower()
+
+
+def guild_folder(guild_id):
+    """server_data/<guild id>/, stable across server renames and unique per server."""
+    return os.path.join(BASE_DIR, str(guild_id))
+
+
+def migrate_name_folder(name_folder, guild_id):
+    """Moves an old server_data/<server name>/ folder to server_data/<guild id>/.
+
+    The old <server name>_stats.json/.csv files become legacy_stats.json/.csv.
+    Returns the new folder, or None if there was nothing to migrate (or the id folder
+    already exists, e.g. migrated by another server that had the same sanitized name).
+    """
+    name = os.path.basename(os.path.normpath(name_folder))
+    if not name or name in (".", "..") or os.path.normpath(name_folder) == os.path.normpath(BASE_DIR):
+        return None
+    target = guild_folder(guild_id)
+    if not os.path.isdir(name_folder) or os.path.exists(target):
+        return None
+
+    os.replace(name_folder, target)
+    for ext in ("json", "csv"):
+        old_path = os.path.join(target, f"{name}_stats.{ext}")
+        if os.path.exists(old_path):
+            os.replace(old_path, os.path.join(target, f"{LEGACY_NAME}_stats.{ext}"))
+    return target
+
+
+class PlayerStore:
+    """SQLite-backed player stats, one row per (guild, player).
+
+    The public methods are coroutines that run the queries in a worker thread,
+    so writes never block the Discord event loop.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            conn.executescript(SNAPSHOT_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _run(self, fn, *args):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return fn(conn, *args)
+
+    async def _call(self, fn, *args):
+        with metrics.span("db", op=fn.__name__.strip("_")):
+            return await asyncio.to_thread(self._run, fn, *args)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ---------- Queries ----------
+
+    @staticmethod
+    def _upsert(conn, guild_id, players):
+        now = time.time()
+        conn.executemany(
+            """
+            INSERT INTO players (guild_id, username_key, username, stats, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (guild_id, username_key) DO UPDATE SET
+                username = excluded.username,
+                stats = excluded.stats,
+                updated_at = excluded.updated_at
+            """,
+            [
+                (guild_id, player_key(p.username), p.username, json.dumps(p.to_dict(), ensure_ascii=False), now)
+                for p in players
+            ],
+        )
+
+    @staticmethod
+    def _delete(conn, guild_id, username):
+        cur = conn.execute(
+            "DELETE FROM players WHERE guild_id = ? AND username_key = ?",
+            (guild_id, player_key(username)),
+        )
+        return cur.rowcount > 0
+
+    @staticmethod
+    def _clear(conn, guild_id):
+        return conn.execute("DELETE FROM players WHERE guild_id = ?", (guild_id,)).rowcount
+
+    @staticmethod
+    def _load(conn, guild_id):
+        rows = conn.execute(
+            "SELECT stats FROM players WHERE guild_id = ? ORDER BY rowid", (guild_id,)
+        ).fetchall()
+        return [PlayerStats.from_dict(json.loads(stats)) for (stats,) in rows]
+
+    @staticmethod
+    def _latest_stats(conn, usernames):
+        # SQLite takes the bare column (stats) from the row holding MAX(updated_at)
+        query = "SELECT username_key, stats, MAX(updated_at) FROM players {} GROUP BY username_key"
+        if usernames is None:
+            rows = conn.execute(query.format("")).fetchall()
+        else:
+            keys = list(dict.fromkeys(player_key(u) for u in usernames))
+            rows = []
+            for i in range(0, len(keys), 500):  # Stays under SQLite's bound parameter limit
+                chunk = keys[i:i + 500]
+                rows += conn.execute(
+                    query.format(f"WHERE username_key IN ({', '.join('?' * len(chunk))})"), chunk
+                ).fetchall()
+        return {key: PlayerStats.from_dict(json.loads(stats)) for key, stats, _ in rows}
+
+    @staticmethod
+    def _get(conn, guild_id, username):
+        row = conn.execute(
+            "SELECT stats FROM players WHERE guild_id = ? AND username_key = ?",
+            (guild_id, player_key(username)),
+        ).fetchone()
+        return PlayerStats.from_dict(json.loads(row[0])) if row else None
+
+    @staticmethod
+    def _latest(conn, username):
+        row = conn.execute(
+            "SELECT stats, updated_at FROM players WHERE username_key = ? ORDER BY updated_at DESC LIMIT 1",
+            (player_key(username),),
+        ).fetchone()
+        return (PlayerStats.from_dict(json.loads(row[0])), row[1]) if row else None
+
+    @staticmethod
+    def _usernames(conn, guild_id):
+        rows = conn.execute(
+            "SELECT username FROM players WHERE guild_id = ? ORDER BY rowid", (guild_id,)
+        ).fetchall()
+        return [username for (username,) in rows]
+
+    @staticmethod
+    def _stale(conn, older_than, limit):
+        rows = conn.execute(
+            """
+            SELECT username_key, MIN(username), MIN(updated_at) AS last_scraped
+            FROM players
+            GROUP BY username_key
+            HAVING last_scraped < ?
+            ORDER BY last_scraped
+            LIMIT ?
+            """,
+            (older_than, limit),
+        ).fetchall()
+        return [(username, last_scraped) for _, username, last_scraped in rows]
+
+    @staticmethod
+    def _refresh(conn, stats):
+        # Every server keeps its own spelling of the username
+        cur = conn.execute(
+            """
+            UPDATE players
+            SET stats = json_set(?, '$.Username', username), updated_at = ?
+            WHERE username_key = ?
+            """,
+            (json.dumps(stats.to_dict(), ensure_ascii=False), time.time(), player_key(stats.username)),
+        )
+        return cur.rowcount
+
+    @staticmethod
+    def _snapshot_row(username, row):
+        values = dict(zip(SNAPSHOT_COLUMNS, row))
+        ordinal = values["rank_ordinal"]
+        if ordinal is not None:
+            values["rank_ordinal"] = int(ordinal)
+        return PlayerStats(username=username, rank=rank_label(ordinal) if ordinal else "N/A", **values)
+
+    @staticmethod
+    def _add_snapshot(conn, stats, taken_at):
+        values = tuple(getattr(stats, column) for column in SNAPSHOT_COLUMNS)
+        if stats.private or all(v is None for v in values):
+            return False
+        key = player_key(stats.username)
+        last = conn.execute(
+            f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM snapshots WHERE username_key = ? ORDER BY taken_at DESC LIMIT 1",
+            (key,),
+        ).fetchone()
+        if last == values:
+            return False  # Nothing changed since the last scrape (no games played)
+        conn.execute(
+            f"INSERT OR REPLACE INTO snapshots VALUES (?, ?, {', '.join('?' * len(values))})",
+            (key, int(taken_at), *values),
+        )
+        return True
+
+    @staticmethod
+    def _history(conn, username, since):
+        rows = conn.execute(
+            f"SELECT taken_at, {', '.join(SNAPSHOT_COLUMNS)} FROM snapshots"
+            " WHERE username_key = ? AND taken_at >= ? ORDER BY taken_at",
+            (player_key(username), since),
+        ).fetchall()
+        return [(row[0], PlayerStore._snapshot_row(username, row[1:])) for row in rows]
+
+    @staticmethod
+    def _form_snapshots(conn, usernames, since):
+        columns = ", ".join(SNAPSHOT_COLUMNS)
+        pairs = {}
+        for username in usernames:
+            key = player_key(username)
+            latest = conn.execute(
+                f"SELECT taken_at, {columns} FROM snapshots WHERE username_key = ? ORDER BY taken_at DESC LIMIT 1",
+                (key,),
+            ).fetchone()
+            if latest is None or latest[0] < since:
+                continue
+            # Last snapshot from before the window, or the first one inside it
+            baseline = conn.execute(
+                f"SELECT taken_at, {columns} FROM snapshots WHERE username_key = ? AND taken_at <= ?"
+                " ORDER BY taken_at DESC LIMIT 1",
+                (key, since),
+            ).fetchone() or conn.execute(
+                f"SELECT taken_at, {columns} FROM snapshots WHERE username_key = ? ORDER BY taken_at LIMIT 1",
+                (key,),
+            ).fetchone()
+            if baseline[0] < latest[0]:
+                pairs[username] = (
+                    PlayerStore._snapshot_row(username, baseline[1:]),
+                    PlayerStore._snapshot_row(username, latest[1:]),
+                )
+        return pairs
+
+    @staticmethod
+    def _get_ai(conn, guild_id, key, newer_than):
+        row = conn.execute(
+            "SELECT response FROM ai_cache WHERE guild_id = ? AND prompt_key = ? AND created_at >= ?",
+            (guild_id, key, newer_than),
+        ).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _put_ai(conn, guild_id, key, response, older_than):
+        now = time.time()
+        # Drop this server's expired answers while we're here
+        conn.execute("DELETE FROM ai_cache WHERE guild_id = ? AND created_at < ?", (guild_id, older_than))
+        conn.execute(
+            "INSERT OR REPLACE INTO ai_cache (guild_id, prompt_key, response, created_at) VALUES (?, ?, ?, ?)",
+            (guild_id, key, response, now),
+        )
+
+    async def upsert_players(self, guild_id, players):
+        """Inserts or updates only the given PlayerStats."""
+        if players:
+            await self._call(self._upsert, guild_id, list(players))
+
+    async def remove_player(self, guild_id, username):
+        """Deletes one player. Returns False if they weren't in the list."""
+        return await self._call(self._delete, guild_id, username)
+
+    async def clear_guild(self, guild_id):
+        """Deletes every player of a server. Returns how many rows were removed."""
+        return await self._call(self._clear, guild_id)
+
+    async def load_players(self, guild_id):
+        """Returns every player of a server as PlayerStats, in the order they were added."""
+        return await self._call(self._load, guild_id)
+
+    async def latest_stats(self, usernames=None):
+        """{username key: most recently saved PlayerStats} of the given players, or of every stored player."""
+        return await self._call(self._latest_stats, None if usernames is None else list(usernames))
+
+    async def get_player(self, guild_id, username):
+        return await self._call(self._get, guild_id, username)
+
+    async def latest_player(self, username):
+        """Most recently saved stats of a player in any server, as (PlayerStats, updated_at), or None."""
+        return await self._call(self._latest, username)
+
+    async def usernames(self, guild_id):
+        return await self._call(self._usernames, guild_id)
+
+    async def stale_players(self, older_than, limit=100):
+        """Players (across all servers) last scraped before the older_than timestamp, oldest first.
+
+        Returns [(username, last_scraped)], one entry per player even if several servers have them.
+        """
+        return await self._call(self._stale, older_than, limit)
+
+    async def refresh_player(self, stats):
+        """Writes fresh stats to every server that has this player. Returns how many rows were updated."""
+        return await self._call(self._refresh, stats)
+
+    async def add_snapshot(self, stats):
+        """Appends freshly scraped stats to the player's history. Returns False if nothing changed."""
+        return await self._call(self._add_snapshot, stats, time.time())
+
+    async def history(self, username, since=0):
+        """[(taken_at, PlayerStats)] of a player, oldest first, from the since timestamp on."""
+        return await self._call(self._history, username, since)
+
+    async def form_snapshots(self, usernames, since):
+        """{username: (baseline PlayerStats, latest PlayerStats)} for players with history since the timestamp."""
+        return await self._call(self._form_snapshots, list(usernames), since)
+
+    async def get_ai_response(self, guild_id, key, ttl):
+        """Cached Gemini answer for this server and prompt key, or None if missing or older than ttl seconds."""
+        return await self._call(self._get_ai, guild_id, key, time.time() - ttl)
+
+    async def put_ai_response(self, guild_id, key, response, ttl):
+        await self._call(self._put_ai, guild_id, key, response, time.time() - ttl)
+
+    # ---------- Legacy import / export ----------
+
+    @staticmethod
+    def _import_folder(conn, guild_id, folder):
+        if conn.execute("SELECT 1 FROM legacy_imports WHERE guild_id = ?", (guild_id,)).fetchone():
+            return []
+
+        json_path = os.path.join(folder, f"{LEGACY_NAME}_stats.json")
+        csv_path = os.path.join(folder, f"{LEGACY_NAME}_stats.csv")
+
+        players = []
+        source = None
+        if os.path.exists(json_path):
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                players = data if isinstance(data, list) else []
+                source = json_path
+            except json.JSONDecodeError:
+                print(f"❌ Error: JSON file is corrupted in '{folder}'. Trying the CSV instead.")
+        if source is None and os.path.exists(csv_path):
+            players = pd.read_csv(csv_path, dtype=str).fillna("N/A").to_dict(orient="records")
+            source = csv_path
+        if source is None:
+            return []
+
+        players = [PlayerStats.from_dict(p) for p in players if p.get("Username")]
+        PlayerStore._upsert(conn, guild_id, players)
+        conn.execute(
+            "INSERT INTO legacy_imports (guild_id, source, imported_at) VALUES (?, ?, ?)",
+            (guild_id, source, time.time()),
+        )
+        return [p.username for p in players]
+
+    async def import_legacy_folder(self, guild_id, folder):
+        """One-shot import of the legacy_stats.json/.csv of a migrated folder. Returns the imported usernames."""
+        if not os.path.isdir(folder):
+            return []
+        return await self._call(self._import_folder, guild_id, folder)
+
+    @staticmethod
+    def _write_exports(players, json_path, csv_path):
+        players = [p.to_dict() for p in players]
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(players, f, indent=4, ensure_ascii=False)
+        df = pd.DataFrame(players) if players else pd.DataFrame(columns=EXPORT_COLUMNS)
+        df.to_csv(csv_path, index=False, encoding="utf-8")
+
+    async def export(self, guild_id, folder, name):
+        """Writes the server's players to <name>_stats.json/.csv in folder. Returns both paths."""
+        os.makedirs(folder, exist_ok=True)
+        json_path = os.path.join(folder, f"{name}_stats.json")
+        csv_path = os.path.join(folder, f"{name}_stats.csv")
+        players = await self.load_players(guild_id)
+        await asyncio.to_thread(self._write_exports, players, json_path, csv_path)
+        return json_path, csv_path